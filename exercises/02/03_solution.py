@@ -177,18 +177,17 @@ def _(emg_signal):
     
     # Step 2: Transpose the array to change dimension order
     # Original shape: (channels, windowsize, window)
-    # After transpose: (window, windowsize, channels)
-    transposed_data = emg_signal.transpose(2, 1, 0)
+    # After transpose: (channels, window, windowsize)
+    # This only changes how numpy looks at the data, nothing is copied yet
+    transposed_data = emg_signal.transpose(0, 2, 1)
     
     # Step 3: Reshape to combine all windows
-    # This combines all windows and samples into one long sequence
+    # This combines all windows and samples of each channel into one long sequence
     # -1 means "calculate this dimension automatically"
-    # Result shape: (window * windowsize, channels)
-    reshaped_data = transposed_data.reshape(-1, num_channels)
-    
-    # Step 4: Transpose back to get channels as first dimension
-    # Final shape: (channels, window * windowsize)
-    channel_data = reshaped_data.T
+    # Result shape: (channels, window * windowsize)
+    # The data is copied exactly once here, channel after channel, so every
+    # channel is one contiguous block of memory (fast for filtering and RMS)
+    channel_data = transposed_data.reshape(num_channels, -1)
     
     # Display information about the restructured data
     print("\nRestructured EMG Data:")
@@ -221,7 +220,7 @@ def _(mo):
 
 
 @app.cell
-def _(channel_data, np, num_channels):
+def _(channel_data, num_channels):
     # Code cell for bandpass filtering
     from scipy import signal  # Import signal processing functions
 
@@ -239,19 +238,19 @@ def _(channel_data, np, num_channels):
     print("-" * 50)
 
 
-    # Design a 4th order Butterworth bandpass filter
+    # Design an 8th order Butterworth bandpass filter
     # This type of filter has a flat frequency response in the passband
-    b, a = signal.butter(8, [low_cut, high_cut], btype='bandpass', fs=2000)
+    # output='sos' returns second-order sections, which stay numerically stable
+    # for high orders where the (b, a) form suffers from rounding errors
+    sos = signal.butter(8, [low_cut, high_cut], btype='bandpass', fs=2000, output='sos')
 
-    # Pre-allocate array for filtered data
-    # This is more efficient than growing a list
     num_samples = channel_data.shape[1]
-    filtered_channels = np.zeros((num_channels, num_samples))
 
-    # Apply the filter to each channel
+    # Apply the filter to all channels at once
     # filtfilt is used because it has zero phase delay
-    for i in range(num_channels):
-        filtered_channels[i, :] = signal.filtfilt(b, a, channel_data[i, :])
+    # axis=1 filters along the samples of every channel in a single call,
+    # which is much faster than a Python loop over the channels
+    filtered_channels = signal.sosfiltfilt(sos, channel_data, axis=1)
 
     # Display information about the filtered signal
     print("\nFiltered Signal Information:")
@@ -260,7 +259,7 @@ def _(channel_data, np, num_channels):
     print(f"Shape of filtered_channels: {filtered_channels.shape}")
     print(f"Type of filtered_channels: {type(filtered_channels)}")
     print(f"Filter cutoff frequencies: {low_cut} Hz to {high_cut} Hz")
-    return a, b, filtered_channels, high_cut, i, low_cut, num_samples, signal
+    return filtered_channels, high_cut, low_cut, num_samples, signal, sos
 
 
 @app.cell
@@ -359,21 +358,27 @@ def _(mo, num_channels):
 
 
 @app.cell
-def _(ch, channel_data, filtered_channels, plt, sampling_rate, signal):
-    # Code cell for power spectrum visualization
+def _(channel_data, filtered_channels, sampling_rate, signal):
+    # Code cell for power spectrum calculation
+    # Calculate the power spectrum of ALL channels at once with axis=-1
+    # This cell does not depend on the channel slider, so marimo only runs it
+    # again when the data changes; moving the slider just picks a row below
+    # Use Welch's method to estimate the power spectral density
+    f_orig, psd_orig_all = signal.welch(channel_data, fs=sampling_rate, nperseg=1024, axis=-1)
+    f_filt, psd_filt_all = signal.welch(filtered_channels, fs=sampling_rate, nperseg=1024, axis=-1)
+    return f_filt, f_orig, psd_filt_all, psd_orig_all
 
 
+@app.cell
+def _(ch, f_filt, f_orig, plt, psd_filt_all, psd_orig_all):
+    # Code cell for power spectrum visualization
+
     # Get the selected channel (convert from 1-based to 0-based indexing)
     selected_channel_2 = ch.value - 1
 
-    # Calculate the power spectrum for both original and filtered signals
-    # Use Welch's method to estimate the power spectral density
-    f_orig, Pxx_orig = signal.welch(channel_data[selected_channel_2, :], 
-                                  fs=sampling_rate, 
-                                  nperseg=1024)
-    f_filt, Pxx_filt = signal.welch(filtered_channels[selected_channel_2, :], 
-                                  fs=sampling_rate, 
-                                  nperseg=1024)
+    # Look up the power spectrum of the selected channel
+    Pxx_orig = psd_orig_all[selected_channel_2]
+    Pxx_filt = psd_filt_all[selected_channel_2]
 
     # Create figure with two subplots
     fig2, (ax5, ax4) = plt.subplots(2, 1, figsize=(12, 8), sharex=True)
@@ -403,16 +408,7 @@ def _(ch, channel_data, filtered_channels, plt, sampling_rate, signal):
 
     plt.tight_layout()
     plt.show()
-    return (
-        Pxx_filt,
-        Pxx_orig,
-        ax4,
-        ax5,
-        f_filt,
-        f_orig,
-        fig2,
-        selected_channel_2,
-    )
+    return Pxx_filt, Pxx_orig, ax4, ax5, fig2, selected_channel_2
 
 
 if __name__ == "__main__":
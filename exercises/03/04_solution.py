@@ -176,9 +176,10 @@ def _(emg_signal):
     num_channels = emg_signal.shape[0]
 
     # Reshape the 3D array to 2D
-    # First transpose to get windows × samples × channels
+    # First transpose to get channels × windows × samples
     # Then reshape to combine all windows for each channel
-    channel_data = emg_signal.transpose(2, 1, 0).reshape(-1, num_channels).T
+    # (one copy, and every channel ends up contiguous in memory)
+    channel_data = emg_signal.transpose(0, 2, 1).reshape(num_channels, -1)
 
     print("\nRestructured EMG Data:")
     print("-" * 50)
@@ -522,10 +523,33 @@ def _(channel_data, np, sampling_rate):
 
 
 
+    # Design the bandpass filter once instead of on every button click
+    # output='sos' (second-order sections) is numerically more stable than (b, a)
+    sos = signal.butter(4, [20, 450], btype='band', fs=sampling_rate, output='sos')
+
+    # The time axis and the processed signals are computed lazily: only when
+    # a button needs them for the first time, and then kept for later clicks
+    t = np.arange(channel_data.shape[1]) / sampling_rate
+    computed = {}
+
+    def get_filtered():
+        if 'filtered' not in computed:
+            # Apply bandpass filter
+            computed['filtered'] = signal.sosfiltfilt(sos, channel_data[20, :])
+        return computed['filtered']
+
+    def get_rms():
+        if 'rms' not in computed:
+            # Calculate RMS with 100ms window
+            window_size = int(0.1 * sampling_rate)
+            squared = channel_data[20, :] ** 2
+            window = np.ones(window_size) / window_size
+            computed['rms'] = np.sqrt(np.convolve(squared, window, mode='same'))
+        return computed['rms']
+
     # Define plotting functions
     def plot_original():
         ax.clear()
-        t = np.arange(channel_data.shape[1]) / sampling_rate
         ax.plot(t, channel_data[20, :])
         ax.set_title("Original EMG Signal")
         ax.set_xlabel("Time (s)")
@@ -535,14 +559,7 @@ def _(channel_data, np, sampling_rate):
 
     def plot_filtered():
         ax.clear()
-        t = np.arange(channel_data.shape[1]) / sampling_rate
-        # Apply bandpass filter
-        nyquist = sampling_rate / 2
-        low = 20 / nyquist
-        high = 450 / nyquist
-        b, a = signal.butter(4, [low, high], btype='band')
-        filtered_data = signal.filtfilt(b, a, channel_data[20, :])
-        ax.plot(t, filtered_data)
+        ax.plot(t, get_filtered())
         ax.set_title("Filtered EMG Signal")
         ax.set_xlabel("Time (s)")
         ax.set_ylabel("Amplitude")
@@ -551,13 +568,7 @@ def _(channel_data, np, sampling_rate):
 
     def plot_rms():
         ax.clear()
-        t = np.arange(channel_data.shape[1]) / sampling_rate
-        # Calculate RMS with 100ms window
-        window_size = int(0.1 * sampling_rate)
-        squared = channel_data[20, :] ** 2
-        window = np.ones(window_size) / window_size
-        rms = np.sqrt(np.convolve(squared, window, mode='same'))
-        ax.plot(t, rms)
+        ax.plot(t, get_rms())
         ax.set_title("RMS EMG Signal")
         ax.set_xlabel("Time (s)")
         ax.set_ylabel("Amplitude")
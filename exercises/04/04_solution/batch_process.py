@@ -0,0 +1,212 @@
+"""
+Headless batch processing of a directory of EMG recordings.
+
+Every recording (.pkl file with 'biosignal' and 'device_information') goes
+through the same steps as the exercise 02 notebook:
+load -> restructure to channels x samples -> bandpass -> RMS -> Welch PSD
+
+Files are processed in parallel by a pool of worker processes. The result
+of each recording is written to <output>/<name>.npz (float32, compressed)
+as soon as it is done, together with the settings it was made with. An
+interrupted run can simply be started again: recordings that already have
+a result with the same settings are skipped, results made with other
+settings are replaced. --force processes every recording again.
+
+With --cache-dir, the bandpass filtered signals are also kept in a
+DerivedCache. Running again with e.g. a different --rms-window then reuses
+them instead of filtering every recording again. Only the filtered signal
+is cached: it is the expensive step, while RMS and PSD are cheap to
+recompute from it and are saved in the result files anyway.
+
+Usage (from the 04_solution folder):
+    python batch_process.py RECORDINGS_DIR OUTPUT_DIR [--workers N] [--low-cut HZ] [--high-cut HZ]
+        [--rms-window SECONDS] [--nperseg N] [--cache-dir DIR] [--force]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from services.derived_cache import DerivedCache
+from services.dtype_policy import resolve_dtype
+from services.recording import Recording
+from services.signal_processor import SignalProcessor
+from services.spectral_analysis import SpectralAnalyzer
+from services.zero_phase import zero_phase_filter
+
+
+def process_recording(pkl_file, output_file, low_cut=20, high_cut=450, rms_window=0.1, nperseg=1024,
+                      cache_dir=None):
+    """
+    Run the processing pipeline on one recording and save the result.
+    
+    Args:
+        pkl_file (str): Path of the recording
+        output_file (str): Path of the .npz result file
+        low_cut (float): Lower bandpass cutoff in Hz (default: 20)
+        high_cut (float): Upper bandpass cutoff in Hz (default: 450)
+        rms_window (float): RMS window length in seconds (default: 0.1)
+        nperseg (int): Welch segment length in samples (default: 1024)
+        cache_dir (str, optional): DerivedCache folder for the filtered signal
+    
+    Returns:
+        tuple: (number of channels, number of samples per channel)
+    """
+    recording = Recording.from_pickle(pkl_file)
+    sampling_rate = recording.sampling_rate
+    dtype = resolve_dtype(None)
+    
+    def bandpass():
+        return zero_phase_filter(recording.data, low_cut, high_cut, order=4, sampling_rate=sampling_rate,
+                                 btype='bandpass', dtype=dtype)
+    
+    if cache_dir is None:
+        filtered = bandpass()
+    else:
+        # Everything the result depends on is part of the key, so e.g. a
+        # float32 run never gets the float64 result of an earlier run
+        filtered = DerivedCache(cache_dir).get_or_compute(
+            pkl_file, 'filtered', bandpass, low_cut=low_cut, high_cut=high_cut, order=4,
+            btype='bandpass', zero_phase=True, dtype=str(dtype),
+        )
+    
+    processor = SignalProcessor(sampling_rate=sampling_rate)
+    rms = processor.calculate_rms(filtered, window_size=int(rms_window * sampling_rate))
+    
+    frequencies, psd = SpectralAnalyzer().welch(filtered, sampling_rate, nperseg=nperseg)
+    
+    # Write to a temporary file first, so a crash never leaves a half written
+    # result behind that would be skipped on the next run
+    temp_file = output_file + '.part'
+    with open(temp_file, 'wb') as f:
+        np.savez_compressed(
+            f,
+            rms=rms.astype(np.float32),
+            psd=psd.astype(np.float32),
+            frequencies=frequencies.astype(np.float32),
+            sampling_rate=sampling_rate,
+            **result_settings(low_cut, high_cut, rms_window, nperseg, dtype),
+        )
+    os.replace(temp_file, output_file)
+    
+    return recording.data.shape
+
+
+def result_settings(low_cut, high_cut, rms_window, nperseg, dtype):
+    """
+    Get the settings that are stored with every result.
+    
+    Args:
+        low_cut (float): Lower bandpass cutoff in Hz
+        high_cut (float): Upper bandpass cutoff in Hz
+        rms_window (float): RMS window length in seconds
+        nperseg (int): Welch segment length in samples
+        dtype: Processing dtype
+    
+    Returns:
+        dict: Name -> value, as saved in the .npz file
+    """
+    return {
+        'band': np.array([low_cut, high_cut], dtype=np.float64),
+        'rms_window': np.float64(rms_window),
+        'nperseg': np.int64(nperseg),
+        'dtype': np.str_(np.dtype(dtype).name),
+    }
+
+
+def has_result(output_file, settings):
+    """
+    Check whether a result file exists and was made with the given settings.
+    
+    Args:
+        output_file (str): Path of the .npz result file
+        settings (dict): Settings from result_settings()
+    
+    Returns:
+        bool: True if the recording does not have to be processed again
+    """
+    if not os.path.exists(output_file):
+        return False
+    try:
+        with np.load(output_file) as result:
+            # Only the small settings arrays are read, not the results
+            return all(name in result.files and np.array_equal(result[name], value)
+                       for name, value in settings.items())
+    except (OSError, ValueError):
+        # Unreadable file, process again
+        return False
+
+
+def find_pending(input_dir, output_dir, settings, force=False):
+    """
+    List the recordings that do not have a result with these settings yet.
+    
+    Args:
+        input_dir (str): Directory with .pkl recordings
+        output_dir (str): Directory with .npz results
+        settings (dict): Settings from result_settings()
+        force (bool): List all recordings, even those with a matching result
+    
+    Returns:
+        list: (pkl_file, output_file) pairs still to process
+    """
+    pending = []
+    for name in sorted(os.listdir(input_dir)):
+        if not name.endswith('.pkl'):
+            continue
+        output_file = os.path.join(output_dir, os.path.splitext(name)[0] + '.npz')
+        if force or not has_result(output_file, settings):
+            pending.append((os.path.join(input_dir, name), output_file))
+    return pending
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch process a directory of EMG recordings")
+    parser.add_argument('input_dir', help="directory with .pkl recordings")
+    parser.add_argument('output_dir', help="directory for the .npz results")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help="number of worker processes (default: one per CPU core)")
+    parser.add_argument('--low-cut', type=float, default=20, help="lower bandpass cutoff in Hz")
+    parser.add_argument('--high-cut', type=float, default=450, help="upper bandpass cutoff in Hz")
+    parser.add_argument('--rms-window', type=float, default=0.1, help="RMS window length in seconds")
+    parser.add_argument('--nperseg', type=int, default=1024, help="Welch segment length in samples")
+    parser.add_argument('--cache-dir', help="folder for caching the filtered signals between runs")
+    parser.add_argument('--force', action='store_true',
+                        help="process all recordings again, even those with an up-to-date result")
+    args = parser.parse_args()
+    
+    os.makedirs(args.output_dir, exist_ok=True)
+    settings = result_settings(args.low_cut, args.high_cut, args.rms_window, args.nperseg, resolve_dtype(None))
+    pending = find_pending(args.input_dir, args.output_dir, settings, args.force)
+    if not pending:
+        print("Nothing to do, all recordings have results with these settings.")
+        return
+    
+    print(f"Processing {len(pending)} recordings with {args.workers} workers...")
+    start = time.perf_counter()
+    failed = 0
+    
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {
+            pool.submit(process_recording, pkl_file, output_file, args.low_cut, args.high_cut,
+                        args.rms_window, args.nperseg, cache_dir=args.cache_dir): pkl_file
+            for pkl_file, output_file in pending
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            name = os.path.basename(futures[future])
+            try:
+                channels, samples = future.result()
+                print(f"[{done}/{len(pending)}] {name}: {channels} channels x {samples} samples")
+            except Exception as e:
+                failed += 1
+                print(f"[{done}/{len(pending)}] {name}: failed ({e})")
+    
+    print(f"Finished in {time.perf_counter() - start:.1f} s, {failed} failed.")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,7 @@
 import sys
+import numpy as np
 from PyQt5.QtWidgets import QApplication
+from services.dtype_policy import set_processing_dtype
 from view.mainView import MainView  
 from viewmodel.mainViewModel import MainViewModel
 
@@ -7,6 +9,9 @@ def main():
     # Create the application
     app = QApplication(sys.argv)
     
+    # Keep all signal data in float32, like the EMG stream itself
+    set_processing_dtype(np.float32)
+    
     # Create the view model
     main_view_model = MainViewModel()
     
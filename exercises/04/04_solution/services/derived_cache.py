@@ -0,0 +1,283 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+
+# Bump when the way results are computed changes, so old entries are not reused
+CACHE_VERSION = 1
+
+
+class DerivedCache:
+    """
+    Persistent on-disk cache for signals derived from recordings.
+    
+    This class is part of the Model layer in the MVVM architecture.
+    Filtering, RMS, PSD or features of a recording only depend on the
+    recording and the processing parameters. The cache stores them under
+    a key that is a hash of exactly those two things:
+    
+        key = sha256(content hash of the source file, name, parameters)
+    
+    so a changed recording or a changed parameter automatically leads to a
+    different key, and stale results are never returned. Hashing a large
+    file takes time, so the content hash of every source file is
+    remembered together with its size and modification time and is only
+    recomputed when one of those changes.
+    
+    Every entry is a folder with one .npy file per array. Hits are opened
+    with np.load(mmap_mode='r'), so reopening a recording takes
+    milliseconds and only the parts that are used are read from disk.
+    
+    The total size is bounded: when it grows above max_bytes, the least
+    recently used entries are deleted.
+    
+    Attributes:
+        cache_dir (str): Folder of the cache
+        max_bytes (int): Largest total size of all entries in bytes
+    """
+    
+    def __init__(self, cache_dir, max_bytes=2 * 1024 ** 3):
+        """
+        Open (or create) a cache folder.
+        
+        Args:
+            cache_dir (str): Folder of the cache
+            max_bytes (int): Largest total size in bytes (default: 2 GiB)
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        
+        self._index_file = os.path.join(cache_dir, 'sources.json')
+        try:
+            with open(self._index_file) as f:
+                self._sources = json.load(f)
+        except (OSError, ValueError):
+            self._sources = {}
+    
+    def key(self, source_file, name, **params):
+        """
+        Get the cache key of a derived signal.
+        
+        Args:
+            source_file (str): Path of the recording
+            name (str): Name of the derived signal, e.g. 'filtered' or 'rms'
+            **params: Processing parameters; anything json can represent
+        
+        Returns:
+            str: Hex digest identifying the signal
+        """
+        description = json.dumps(
+            {'version': CACHE_VERSION, 'source': self.source_hash(source_file), 'name': name, 'params': params},
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(description.encode()).hexdigest()
+    
+    def source_hash(self, source_file):
+        """
+        Get the content hash of a source file.
+        
+        Args:
+            source_file (str): Path of the recording
+        
+        Returns:
+            str: sha256 hex digest of the file content
+        """
+        path = os.path.abspath(source_file)
+        stat = os.stat(path)
+        fingerprint = [stat.st_size, stat.st_mtime_ns]
+        
+        known = self._sources.get(path)
+        if known is not None and known['fingerprint'] == fingerprint:
+            return known['sha256']
+        
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        
+        with self._lock:
+            self._sources[path] = {'fingerprint': fingerprint, 'sha256': digest.hexdigest()}
+            self._write_index()
+        return digest.hexdigest()
+    
+    def get(self, key):
+        """
+        Look up an entry.
+        
+        Args:
+            key (str): Cache key from key()
+        
+        Returns:
+            tuple: Read-only memory-mapped arrays of the entry, or None if
+                the key is not cached
+        """
+        entry = os.path.join(self.cache_dir, key)
+        try:
+            names = sorted((n for n in os.listdir(entry) if n.endswith('.npy')), key=lambda n: int(n[:-4]))
+            arrays = tuple(np.load(os.path.join(entry, n), mmap_mode='r') for n in names)
+        except (OSError, ValueError):
+            return None
+        if not arrays:
+            return None
+        
+        # The modification time of the folder records the last use
+        os.utime(entry)
+        return arrays
+    
+    def put(self, key, arrays):
+        """
+        Store an entry and evict old entries if the cache is too large.
+        
+        Args:
+            key (str): Cache key from key()
+            arrays (tuple): Arrays to store
+        
+        Returns:
+            tuple: The stored arrays, memory-mapped from the cache
+        """
+        entry = os.path.join(self.cache_dir, key)
+        
+        # Write into a temporary folder and rename it, so readers and a
+        # crash never see half written entries
+        temp_entry = f"{entry}.{os.getpid()}.{threading.get_ident()}.part"
+        os.makedirs(temp_entry, exist_ok=True)
+        for i, array in enumerate(arrays):
+            np.save(os.path.join(temp_entry, f'{i}.npy'), np.asarray(array))
+        try:
+            os.rename(temp_entry, entry)
+        except OSError:
+            # Someone else stored the same entry in the meantime
+            shutil.rmtree(temp_entry, ignore_errors=True)
+        
+        self.evict()
+        return self.get(key)
+    
+    def get_or_compute(self, source_file, name, compute, **params):
+        """
+        Get a derived signal, computing and storing it on a miss.
+        
+        Args:
+            source_file (str): Path of the recording
+            name (str): Name of the derived signal
+            compute (callable): Called without arguments on a miss; returns
+                one array or a tuple of arrays
+            **params: Processing parameters that compute depends on
+        
+        Returns:
+            np.ndarray or tuple: What compute returns, memory-mapped from the cache
+        """
+        key = self.key(source_file, name, **params)
+        arrays = self.get(key)
+        if arrays is None:
+            result = compute()
+            single = not isinstance(result, tuple)
+            arrays = self.put(key, (result,) if single else result)
+            if arrays is None:
+                # Evicted right away because it is larger than the cache
+                return result
+        else:
+            single = len(arrays) == 1
+        return arrays[0] if single else arrays
+    
+    def size(self):
+        """
+        Get the total size of all entries.
+        
+        Returns:
+            int: Size in bytes
+        """
+        return sum(size for _, _, size in self._entries())
+    
+    def evict(self):
+        """
+        Delete least recently used entries until the cache fits in max_bytes.
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, _, size in entries)
+        for _, entry, size in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+    
+    def clear(self):
+        """
+        Delete all entries.
+        """
+        for _, entry, _ in self._entries():
+            shutil.rmtree(entry, ignore_errors=True)
+    
+    def _entries(self):
+        """
+        List the entries.
+        
+        Returns:
+            list: (last use time, folder, size in bytes) of every entry
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            entry = os.path.join(self.cache_dir, name)
+            if name.endswith('.part') or not os.path.isdir(entry):
+                continue
+            try:
+                size = sum(f.stat().st_size for f in os.scandir(entry))
+                entries.append((os.stat(entry).st_mtime, entry, size))
+            except OSError:
+                continue
+        return entries
+    
+    def _write_index(self):
+        """
+        Save the known source hashes (caller holds the lock).
+        """
+        temp_file = f"{self._index_file}.{os.getpid()}.part"
+        with open(temp_file, 'w') as f:
+            json.dump(self._sources, f)
+        os.replace(temp_file, self._index_file)
+
+
+if __name__ == '__main__':
+    import functools
+    import sys
+    import tempfile
+    import time
+    from services.recording import Recording
+    from services.signal_processor import SignalProcessor
+    from services.spectral_analysis import SpectralAnalyzer
+    from services.zero_phase import zero_phase_filter
+    
+    # Usage (from the 04_solution folder): python -m services.derived_cache RECORDING.pkl [CACHE_DIR]
+    pkl_file = sys.argv[1]
+    cache_dir = sys.argv[2] if len(sys.argv) > 2 else os.path.join(tempfile.gettempdir(), 'emg_cache')
+    cache = DerivedCache(cache_dir)
+    
+    for attempt in ('first open', 'reopen'):
+        start = time.perf_counter()
+        
+        # The recording itself is only loaded if something has to be computed
+        load = functools.lru_cache(maxsize=None)(lambda: Recording.from_pickle(pkl_file))
+        filtered = cache.get_or_compute(
+            pkl_file, 'filtered',
+            lambda: zero_phase_filter(load().data, 20, 450, sampling_rate=load().sampling_rate),
+            low_cut=20, high_cut=450, order=4,
+        )
+        rms = cache.get_or_compute(
+            pkl_file, 'rms',
+            lambda: SignalProcessor(sampling_rate=load().sampling_rate).calculate_rms(
+                filtered, window_size=int(0.1 * load().sampling_rate)),
+            low_cut=20, high_cut=450, order=4, window=0.1,
+        )
+        frequencies, psd = cache.get_or_compute(
+            pkl_file, 'psd',
+            lambda: SpectralAnalyzer().welch(np.asarray(filtered), load().sampling_rate, nperseg=1024),
+            low_cut=20, high_cut=450, order=4, nperseg=1024,
+        )
+        print(f"{attempt}: {(time.perf_counter() - start) * 1000:.1f} ms "
+              f"(filtered {filtered.shape}, rms {rms.shape}, psd {psd.shape})")
+    print(f"Cache size: {cache.size() / 1024 ** 2:.1f} MiB in {cache.cache_dir}")
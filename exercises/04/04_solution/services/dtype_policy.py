@@ -0,0 +1,139 @@
+"""
+Pipeline-wide floating point precision.
+
+The EMG stream arrives as float32. By default the services compute in
+float64, which doubles memory and bandwidth without adding meaningful
+accuracy for 24-bit (or less) biosignals. Calling
+set_processing_dtype(np.float32) once at start-up makes every service
+that is created afterwards keep its data in float32, from the received
+packets through filtering and RMS to the display.
+
+Running sums and filter designs are still computed in float64 internally
+where rounding would otherwise accumulate; only the data arrays and
+results use the processing dtype.
+
+Run `python -m services.dtype_policy` from the 04_solution folder to
+compare the float32 and float64 results of every stage. It exits with
+status 1 if any stage is off by more than FLOAT32_TOLERANCE, so it can be
+used as a regression check.
+"""
+import sys
+
+import numpy as np
+
+SUPPORTED_DTYPES = (np.dtype(np.float32), np.dtype(np.float64))
+
+_processing_dtype = np.dtype(np.float64)
+
+# Largest accepted error of a float32 stage, relative to the float64 result
+FLOAT32_TOLERANCE = 1e-4
+
+
+def set_processing_dtype(dtype):
+    """
+    Set the dtype used by services created from now on.
+    
+    Args:
+        dtype: np.float32 or np.float64
+    """
+    global _processing_dtype
+    dtype = np.dtype(dtype)
+    if dtype not in SUPPORTED_DTYPES:
+        raise ValueError(f"Processing dtype must be float32 or float64, got {dtype}")
+    _processing_dtype = dtype
+
+
+def get_processing_dtype():
+    """
+    Get the current pipeline-wide processing dtype.
+    
+    Returns:
+        np.dtype: The processing dtype
+    """
+    return _processing_dtype
+
+
+def resolve_dtype(dtype=None):
+    """
+    Get the dtype a service should use.
+    
+    Args:
+        dtype (optional): Explicit dtype of the service, None for the pipeline default
+    
+    Returns:
+        np.dtype: The dtype to use
+    """
+    if dtype is None:
+        return _processing_dtype
+    dtype = np.dtype(dtype)
+    if dtype not in SUPPORTED_DTYPES:
+        raise ValueError(f"Processing dtype must be float32 or float64, got {dtype}")
+    return dtype
+
+
+def check_float32_accuracy(duration=30, sampling_rate=2048, channels=32):
+    """
+    Compare float32 and float64 results of every processing stage.
+    
+    Args:
+        duration (float): Length of the test signal in seconds (default: 30)
+        sampling_rate (int): Sampling rate in Hz (default: 2048)
+        channels (int): Number of channels (default: 32)
+    
+    Returns:
+        dict: Stage name -> largest error of the float32 result relative
+            to the largest magnitude of the float64 result
+    """
+    # Imported here because the services themselves import this module
+    from services.notch_filter import PowerLineFilter
+    from services.resampling import ResamplingPipeline
+    from services.signal_processor import SignalProcessor
+    from services.spectral_analysis import SpectralAnalyzer
+    from services.streaming_filter import StreamingFilter
+    from services.streaming_stft import StreamingSTFT
+    from services.zero_phase import zero_phase_filter
+    
+    rng = np.random.default_rng(0)
+    data = rng.normal(0, 1e-4, (channels, int(duration * sampling_rate)))
+    data32 = data.astype(np.float32)
+    
+    def packets(stage, source):
+        # Feed the data packet by packet, like the live app does
+        chunks = np.array_split(source, source.shape[-1] // 18, axis=-1)
+        return np.concatenate([stage.process(chunk) for chunk in chunks], axis=-1)
+    
+    def relative_error(result32, result64):
+        if result32.dtype != np.float32:
+            raise TypeError(f"Expected a float32 result, got {result32.dtype}")
+        return float(np.max(np.abs(result32 - result64)) / np.max(np.abs(result64)))
+    
+    results_by_dtype = {}
+    for dtype in (np.float32, np.float64):
+        processor = SignalProcessor(sampling_rate=sampling_rate, dtype=dtype)
+        source = data32 if dtype == np.float32 else data
+        results = {
+            'rms': processor.calculate_rms(source, window_size=sampling_rate // 10),
+            'rms_envelopes': processor.calculate_rms_envelopes(source),
+            'streaming_filter': packets(StreamingFilter(sampling_rate=sampling_rate, dtype=dtype), source),
+            'notch_filter': packets(PowerLineFilter(sampling_rate=sampling_rate, dtype=dtype), source),
+            'zero_phase_filter': zero_phase_filter(source, sampling_rate=sampling_rate, dtype=dtype),
+            'welch': SpectralAnalyzer().welch(source, sampling_rate)[1],
+            'stft': packets(StreamingSTFT(sampling_rate=sampling_rate, dtype=dtype), source),
+            'decimation': ResamplingPipeline(sampling_rate, dtype=dtype).run(source)[sampling_rate / 64],
+        }
+        results_by_dtype[np.dtype(dtype).name] = results
+    
+    return {stage: relative_error(results_by_dtype['float32'][stage], results_by_dtype['float64'][stage])
+            for stage in results_by_dtype['float64']}
+
+
+if __name__ == '__main__':
+    errors = check_float32_accuracy()
+    for stage, error in errors.items():
+        status = 'ok' if error <= FLOAT32_TOLERANCE else 'FAILED'
+        print(f"{stage:>18}: relative error {error:.2e} {status}")
+    
+    failed = [stage for stage, error in errors.items() if error > FLOAT32_TOLERANCE]
+    if failed:
+        print(f"float32 error above {FLOAT32_TOLERANCE:.0e} in: {', '.join(failed)}")
+        sys.exit(1)
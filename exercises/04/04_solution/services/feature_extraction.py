@@ -0,0 +1,112 @@
+import numpy as np
+
+# Order of the features in the output tensor
+FEATURE_NAMES = ('mav', 'wl', 'zc', 'ssc', 'rms', 'var', 'mnf', 'mdf')
+
+
+class FeatureExtractor:
+    """
+    Computes classic EMG features for every channel and window at once.
+    
+    This class is part of the Model layer in the MVVM architecture. It works
+    directly on the windowed layout of the recordings, (channels, samples,
+    windows), e.g. data['biosignal'] with 18 samples per window, so no
+    reshaping or copying is needed. A single TCP packet of shape
+    (channels, samples) is treated as one window.
+    
+    Features (computed along the samples axis of every window):
+        mav: Mean absolute value
+        wl:  Waveform length (sum of absolute differences)
+        zc:  Number of zero crossings
+        ssc: Number of slope sign changes
+        rms: Root mean square
+        var: Variance (with N - 1 in the denominator)
+        mnf: Mean frequency of the power spectrum in Hz
+        mdf: Median frequency of the power spectrum in Hz
+    
+    Attributes:
+        sampling_rate (float): Sampling rate in Hz
+        threshold (float): Minimum amplitude difference for zc and ssc to count,
+            which keeps noise around zero from being counted
+    """
+    
+    def __init__(self, sampling_rate=2048, threshold=0.0):
+        """
+        Initialize the feature extractor.
+        
+        Args:
+            sampling_rate (float): Sampling rate in Hz (default: 2048)
+            threshold (float): Noise threshold for zc and ssc (default: 0.0)
+        """
+        self.sampling_rate = sampling_rate
+        self.threshold = threshold
+    
+    def extract(self, data):
+        """
+        Compute all features.
+        
+        Args:
+            data (np.ndarray): Windowed data of shape (channels, samples, windows),
+                or a single window of shape (channels, samples)
+        
+        Returns:
+            np.ndarray: float32 features of shape (channels, features, windows),
+                or (channels, features) for a single window. The feature
+                order is given by FEATURE_NAMES.
+        """
+        data = np.asarray(data)
+        single_window = data.ndim == 2
+        if single_window:
+            data = data[..., np.newaxis]
+        
+        num_samples = data.shape[1]
+        features = np.empty((data.shape[0], len(FEATURE_NAMES), data.shape[2]), dtype=np.float32)
+        
+        # Differences between neighbouring samples, shape (channels, samples - 1, windows)
+        diff = np.diff(data, axis=1)
+        
+        # Amplitude features
+        features[:, 0] = np.mean(np.abs(data), axis=1)
+        features[:, 1] = np.sum(np.abs(diff), axis=1)
+        features[:, 4] = np.sqrt(np.mean(np.square(data, dtype=np.float64), axis=1))
+        features[:, 5] = np.var(data, axis=1, ddof=1) if num_samples > 1 else 0.0
+        
+        # Zero crossings: sign changes between neighbours with a large enough step
+        sign_change = (data[:, :-1] * data[:, 1:]) < 0
+        features[:, 2] = np.sum(sign_change & (np.abs(diff) >= self.threshold), axis=1)
+        
+        # Slope sign changes: the sample is a local maximum or minimum
+        slope_product = -diff[:, :-1] * diff[:, 1:]
+        features[:, 3] = np.sum(slope_product > self.threshold, axis=1)
+        
+        # Frequency features from the power spectrum of every window
+        power = np.abs(np.fft.rfft(data, axis=1)) ** 2
+        frequencies = np.fft.rfftfreq(num_samples, d=1 / self.sampling_rate)[:, np.newaxis]
+        total_power = np.sum(power, axis=1)
+        
+        # Windows without any power (e.g. all zeros) get frequency 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_frequency = np.sum(power * frequencies, axis=1) / total_power
+        features[:, 6] = np.where(total_power > 0, mean_frequency, 0.0)
+        
+        # Median frequency: first bin where the cumulative power reaches half
+        cumulative = np.cumsum(power, axis=1)
+        median_bin = np.argmax(cumulative >= total_power[:, np.newaxis] / 2, axis=1)
+        features[:, 7] = frequencies[median_bin, 0]
+        
+        if single_window:
+            return features[..., 0]
+        return features
+    
+    @staticmethod
+    def feature_index(name):
+        """
+        Get the position of a feature in the output tensor.
+        
+        Args:
+            name (str): Feature name, one of FEATURE_NAMES
+        
+        Returns:
+            int: Index along the features axis
+        """
+        return FEATURE_NAMES.index(name)
@@ -0,0 +1,237 @@
+from functools import lru_cache
+
+import numpy as np
+from scipy import signal
+
+# Number of different filter designs kept in memory
+FILTER_CACHE_SIZE = 32
+
+
+class FilterDesign:
+    """
+    A designed Butterworth filter in second-order-sections (SOS) form.
+    
+    Instances are shared by everybody who asks for the same filter, so the
+    coefficient arrays must not be modified. (They are not flagged read-only
+    because scipy.signal.sosfilt refuses read-only coefficient buffers.)
+    
+    Attributes:
+        btype (str): Filter type ('bandpass', 'bandstop', 'lowpass', 'highpass')
+        order (int): Order of the Butterworth filter
+        band (float or tuple): Cutoff frequency or (low, high) cutoffs in Hz
+        sampling_rate (float): Sampling rate in Hz
+        sos (np.ndarray): Filter coefficients, shape (sections, 6)
+        zi (np.ndarray): Steady-state filter state for a unit input, shape (sections, 2)
+    """
+    
+    def __init__(self, btype, order, band, sampling_rate):
+        """
+        Design the filter.
+        
+        Use get_filter() instead of creating designs directly, so that
+        equal designs are only computed once.
+        
+        Args:
+            btype (str): Filter type
+            order (int): Order of the Butterworth filter
+            band (float or tuple): Cutoff frequency or (low, high) cutoffs in Hz
+            sampling_rate (float): Sampling rate in Hz
+        """
+        self.btype = btype
+        self.order = order
+        self.band = band
+        self.sampling_rate = sampling_rate
+        
+        # SOS form stays stable for high orders and low cutoffs, unlike (b, a)
+        self.sos = signal.butter(order, band, btype=btype, fs=sampling_rate, output='sos')
+        self.zi = signal.sosfilt_zi(self.sos)
+        self._sos_by_dtype = {self.sos.dtype: self.sos}
+    
+    def sos_as(self, dtype):
+        """
+        Get the coefficients in the given dtype.
+        
+        sosfilt computes in the common dtype of coefficients, data and state,
+        so float32 data needs float32 coefficients to stay float32. The
+        design itself is always done in float64 and cast once.
+        
+        Args:
+            dtype: np.float32 or np.float64
+        
+        Returns:
+            np.ndarray: Filter coefficients in SOS form (shared, do not modify)
+        """
+        dtype = np.dtype(dtype)
+        if dtype not in self._sos_by_dtype:
+            self._sos_by_dtype[dtype] = self.sos.astype(dtype)
+        return self._sos_by_dtype[dtype]
+    
+    def initial_state(self, first_samples, dtype=np.float64):
+        """
+        Build a filter state that starts in steady state for the given samples.
+        
+        Args:
+            first_samples (np.ndarray): First sample of every channel
+                (a scalar for a single channel)
+            dtype: dtype of the state (default: np.float64)
+        
+        Returns:
+            np.ndarray: State of shape (sections, *channels, 2) for sosfilt
+        """
+        first_samples = np.asarray(first_samples)
+        
+        # (sections, 2) -> (sections, 1, ..., 1, 2) so it broadcasts over channels
+        template = self.zi.reshape((self.zi.shape[0],) + (1,) * first_samples.ndim + (2,))
+        return (template * first_samples[np.newaxis, ..., np.newaxis]).astype(dtype, copy=False)
+    
+    def __repr__(self):
+        return (f"FilterDesign(btype={self.btype!r}, order={self.order}, "
+                f"band={self.band}, sampling_rate={self.sampling_rate})")
+
+
+def get_filter(btype, order, band, sampling_rate):
+    """
+    Get a Butterworth filter design from the shared cache.
+    
+    Designs are keyed by (btype, order, band, sampling_rate). The first
+    request designs the filter, later requests return the same object.
+    The cache keeps the FILTER_CACHE_SIZE most recently used designs.
+    
+    Args:
+        btype (str): 'bandpass', 'bandstop', 'lowpass' or 'highpass'
+        order (int): Order of the Butterworth filter
+        band (float or sequence): Cutoff frequency or (low, high) cutoffs in Hz
+        sampling_rate (float): Sampling rate in Hz
+    
+    Returns:
+        FilterDesign: The shared filter design
+    
+    Example:
+        >>> design = get_filter('bandpass', 4, (20, 450), 2048)
+        >>> filtered = signal.sosfiltfilt(design.sos, data, axis=-1)
+    """
+    # Normalize the key so [20, 450], (20, 450) and (20.0, 450.0) share one entry
+    if np.ndim(band) == 0:
+        band = float(band)
+    else:
+        band = tuple(float(f) for f in band)
+    
+    return _cached_filter(btype, int(order), band, float(sampling_rate))
+
+
+def filter_band(btype, low_cut, high_cut):
+    """
+    Pick the band argument of get_filter() from a pair of cutoffs.
+    
+    The cutoffs are the edges of the passband (the stopband for bandstop):
+    a lowpass passes everything below high_cut, a highpass everything
+    above low_cut. The other cutoff is ignored and may be None.
+    
+    Args:
+        btype (str): 'bandpass', 'bandstop', 'lowpass' or 'highpass'
+        low_cut (float): Lower cutoff frequency in Hz
+        high_cut (float): Upper cutoff frequency in Hz
+    
+    Returns:
+        float or tuple: The cutoff or the (low, high) cutoffs
+    
+    Raises:
+        ValueError: If a cutoff the filter type needs is None
+    """
+    if btype == 'lowpass':
+        if high_cut is None:
+            raise ValueError("A lowpass filter needs high_cut")
+        return high_cut
+    if btype == 'highpass':
+        if low_cut is None:
+            raise ValueError("A highpass filter needs low_cut")
+        return low_cut
+    if low_cut is None or high_cut is None:
+        raise ValueError(f"A {btype} filter needs low_cut and high_cut")
+    return (low_cut, high_cut)
+
+
+@lru_cache(maxsize=FILTER_CACHE_SIZE)
+def _cached_filter(btype, order, band, sampling_rate):
+    return FilterDesign(btype, order, band, sampling_rate)
+
+
+def get_notch_filter(frequency, sampling_rate, harmonics=1, quality=30.0):
+    """
+    Get a cached comb of notch filters for a frequency and its harmonics.
+    
+    Every notch (frequency, 2 * frequency, ...) is a second-order IIR notch
+    (signal.iirnotch), which is exactly one second-order section. The notches
+    are stacked into one SOS array, so all of them are applied by a single
+    sosfilt call. Harmonics at or above the Nyquist frequency are skipped.
+    
+    Args:
+        frequency (float): Fundamental frequency to remove in Hz, e.g. 50
+        sampling_rate (float): Sampling rate in Hz
+        harmonics (int): Number of notches including the fundamental (default: 1)
+        quality (float): Quality factor, frequency / notch bandwidth (default: 30.0)
+    
+    Returns:
+        np.ndarray: Filter coefficients in SOS form (shared, do not modify)
+    """
+    # Round so that tiny changes of a tracked frequency do not fill the cache
+    frequency = round(float(frequency), 2)
+    return _cached_notch_filter(frequency, float(sampling_rate), int(harmonics), float(quality))
+
+
+@lru_cache(maxsize=FILTER_CACHE_SIZE)
+def _cached_notch_filter(frequency, sampling_rate, harmonics, quality):
+    sections = []
+    for harmonic in range(1, harmonics + 1):
+        notch_frequency = harmonic * frequency
+        if notch_frequency >= sampling_rate / 2:
+            break
+        b, a = signal.iirnotch(notch_frequency, quality, fs=sampling_rate)
+        sections.append(np.concatenate((b, a)))
+    if not sections:
+        raise ValueError(f"{frequency} Hz is above the Nyquist frequency of {sampling_rate / 2} Hz")
+    return np.array(sections)
+
+
+def filter_cache_info():
+    """
+    Get hit/miss statistics of the filter design cache.
+    
+    Returns:
+        functools._CacheInfo: (hits, misses, maxsize, currsize)
+    """
+    return _cached_filter.cache_info()
+
+
+def clear_filter_cache():
+    """
+    Remove all filter designs from the cache.
+    """
+    _cached_filter.cache_clear()
+    _cached_notch_filter.cache_clear()
+    _cached_decimation_filter.cache_clear()
+
+
+def get_decimation_filter(factor, numtaps=None):
+    """
+    Get the FIR anti-aliasing lowpass for decimating by an integer factor.
+    
+    Uses the same design as signal.resample_poly: a Kaiser window
+    (beta=5.0) with the cutoff at the new Nyquist frequency. Designs are
+    cached like the Butterworth filters in get_filter().
+    
+    Args:
+        factor (int): Decimation factor
+        numtaps (int, optional): Number of filter taps (default: 20 * factor + 1)
+    
+    Returns:
+        np.ndarray: Filter taps (shared, do not modify)
+    """
+    if numtaps is None:
+        numtaps = 20 * int(factor) + 1
+    return _cached_decimation_filter(int(factor), int(numtaps))
+
+
+@lru_cache(maxsize=FILTER_CACHE_SIZE)
+def _cached_decimation_filter(factor, numtaps):
+    return signal.firwin(numtaps, 1 / factor, window=('kaiser', 5.0))
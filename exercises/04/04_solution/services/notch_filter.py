@@ -0,0 +1,178 @@
+import numpy as np
+from scipy import signal
+from services.dtype_policy import resolve_dtype
+from services.filter_design import get_notch_filter
+
+
+class PowerLineFilter:
+    """
+    Removes power line interference (50/60 Hz and harmonics) from live data.
+    
+    This class is part of the Model layer in the MVVM architecture. It:
+    - Applies a comb of IIR notches at the line frequency and its harmonics
+    - Filters all channels of a chunk with a single sosfilt call
+    - Carries the filter state (zi) from one chunk to the next
+    - Optionally tracks the actual line frequency, which can drift
+      slightly away from its nominal value
+    
+    Every notch is one second-order section, so the cost per sample is small
+    and the filter adds no buffering delay to the packet path.
+    
+    Frequency tracking looks at the average over all channels (the
+    interference is common to all electrodes) and, every `track_interval`
+    seconds, searches the spectrum of the last `track_window` seconds for
+    the strongest peak near the nominal frequency. If it moved by more than
+    0.05 Hz, the notches are moved there while the filter state is kept.
+    
+    Attributes:
+        line_frequency (float): Frequency currently removed in Hz
+        nominal_frequency (float): Expected line frequency in Hz
+        sampling_rate (float): Sampling rate in Hz
+        sos (np.ndarray): Current notch filter coefficients in SOS form
+        dtype (np.dtype): dtype of the filtered data and the state
+        zi (np.ndarray): Current filter state, None before the first chunk
+    """
+    
+    def __init__(self, line_frequency=50.0, sampling_rate=2048, harmonics=4, quality=30.0,
+                 track_frequency=False, max_deviation=1.0, track_window=4.0, track_interval=1.0,
+                 dtype=None):
+        """
+        Initialize the power line filter.
+        
+        Args:
+            line_frequency (float): Nominal line frequency in Hz, 50 or 60 (default: 50.0)
+            sampling_rate (float): Sampling rate in Hz (default: 2048)
+            harmonics (int): Number of notches including the fundamental (default: 4)
+            quality (float): Quality factor of every notch (default: 30.0)
+            track_frequency (bool): Re-estimate the line frequency from the data (default: False)
+            max_deviation (float): Largest accepted distance from the nominal
+                frequency in Hz when tracking (default: 1.0)
+            track_window (float): Seconds of data used for one estimate (default: 4.0)
+            track_interval (float): Seconds between two estimates (default: 1.0)
+            dtype (optional): float32 or float64, None for the pipeline default
+        """
+        self.nominal_frequency = line_frequency
+        self.line_frequency = line_frequency
+        self.sampling_rate = sampling_rate
+        self.harmonics = harmonics
+        self.quality = quality
+        self.track_frequency = track_frequency
+        self.max_deviation = max_deviation
+        self.dtype = resolve_dtype(dtype)
+        
+        self.sos = self._design(line_frequency)
+        self.zi = None
+        
+        # Ring buffer of the channel average, used for frequency tracking
+        self._track_length = int(track_window * sampling_rate)
+        self._track_interval = int(track_interval * sampling_rate)
+        self._track_buffer = np.zeros(self._track_length)
+        self._track_position = 0
+        self._samples_seen = 0
+        self._samples_since_estimate = 0
+    
+    def reset(self):
+        """
+        Forget the filter state and go back to the nominal frequency.
+        """
+        self.zi = None
+        self.line_frequency = self.nominal_frequency
+        self.sos = self._design(self.line_frequency)
+        self._track_buffer[:] = 0
+        self._track_position = 0
+        self._samples_seen = 0
+        self._samples_since_estimate = 0
+    
+    def process(self, chunk):
+        """
+        Filter the next chunk of samples.
+        
+        Args:
+            chunk (np.ndarray): New samples, 1-D or (channels, samples)
+        
+        Returns:
+            np.ndarray: Filtered samples with the same shape as chunk
+        """
+        chunk = np.asarray(chunk, dtype=self.dtype)
+        if chunk.shape[-1] == 0:
+            # Nothing to filter, e.g. after a decimation stage; keep the state
+            return chunk
+        if self.track_frequency:
+            self._update_frequency(chunk)
+        
+        if self.zi is None:
+            self.zi = np.zeros((len(self.sos),) + chunk.shape[:-1] + (2,), dtype=self.dtype)
+        elif self.zi.shape[1:-1] != chunk.shape[:-1]:
+            raise ValueError(
+                f"Expected chunks with leading shape {self.zi.shape[1:-1]}, got {chunk.shape[:-1]}"
+            )
+        
+        filtered, self.zi = signal.sosfilt(self.sos, chunk, axis=-1, zi=self.zi)
+        return filtered
+    
+    def _design(self, frequency):
+        """
+        Get the notch comb for a line frequency in the processing dtype.
+        
+        Args:
+            frequency (float): Line frequency in Hz
+        
+        Returns:
+            np.ndarray: Filter coefficients in SOS form
+        """
+        sos = get_notch_filter(frequency, self.sampling_rate, self.harmonics, self.quality)
+        return sos.astype(self.dtype, copy=False)
+    
+    def _update_frequency(self, chunk):
+        """
+        Store the chunk for tracking and re-estimate the line frequency when due.
+        
+        Args:
+            chunk (np.ndarray): New samples, 1-D or (channels, samples)
+        """
+        common = chunk if chunk.ndim == 1 else chunk.reshape(-1, chunk.shape[-1]).mean(axis=0)
+        common = common[-self._track_length:]
+        
+        positions = (self._track_position + np.arange(len(common))) % self._track_length
+        self._track_buffer[positions] = common
+        self._track_position = (positions[-1] + 1) % self._track_length
+        self._samples_seen += chunk.shape[-1]
+        self._samples_since_estimate += chunk.shape[-1]
+        
+        if self._samples_seen < self._track_length or self._samples_since_estimate < self._track_interval:
+            return
+        self._samples_since_estimate = 0
+        
+        estimate = self.estimate_line_frequency(np.roll(self._track_buffer, -self._track_position))
+        if estimate is not None and abs(estimate - self.line_frequency) > 0.05:
+            self.line_frequency = estimate
+            self.sos = self._design(estimate)
+    
+    def estimate_line_frequency(self, data):
+        """
+        Estimate the line frequency from a stretch of signal.
+        
+        The strongest spectral peak within max_deviation of the nominal
+        frequency is located on a zero-padded FFT (0.05 Hz resolution) and
+        refined by parabolic interpolation.
+        
+        Args:
+            data (np.ndarray): 1-D signal, a few seconds long
+        
+        Returns:
+            float: Estimated line frequency in Hz, or None if the data has
+                no power near the nominal frequency
+        """
+        n_fft = max(len(data), int(self.sampling_rate / 0.05))
+        spectrum = np.abs(np.fft.rfft(data * np.hanning(len(data)), n=n_fft))
+        frequencies = np.fft.rfftfreq(n_fft, d=1 / self.sampling_rate)
+        
+        band = np.flatnonzero(np.abs(frequencies - self.nominal_frequency) <= self.max_deviation)
+        peak = band[np.argmax(spectrum[band])]
+        if spectrum[peak] == 0 or peak in (band[0], band[-1]):
+            return None
+        
+        # Parabolic interpolation between the peak and its neighbours
+        left, center, right = spectrum[peak - 1:peak + 2]
+        offset = 0.5 * (left - right) / (left - 2 * center + right)
+        return frequencies[peak] + offset * (frequencies[1] - frequencies[0])
@@ -0,0 +1,252 @@
+import numpy as np
+from services.dtype_policy import resolve_dtype
+from services.signal_processor import StreamingRMS
+
+# One record per detected onset or offset
+EVENT_DTYPE = np.dtype([
+    ('sample', np.int64),     # Global sample index of the transition
+    ('channel', np.int16),    # Channel index (0 for 1-D data)
+    ('onset', np.bool_),      # True for an onset, False for an offset
+    ('amplitude', np.float32),  # Envelope value at the transition
+])
+
+
+class OnsetDetector:
+    """
+    Detects when muscles switch on and off in live data.
+    
+    This class is part of the Model layer in the MVVM architecture. For
+    every chunk (e.g. a 32x18 TCP packet) it:
+    - Computes an amplitude envelope, either the sliding RMS or the
+      Teager-Kaiser energy operator (TKEO) smoothed the same way
+    - Compares the envelope to thresholds derived from the baseline
+      (resting) level of every channel
+    - Uses hysteresis: a channel becomes active above the onset threshold
+      and only becomes inactive again below the lower offset threshold,
+      so noise around a single threshold does not cause flickering
+    - Returns the transitions as compact event records (EVENT_DTYPE)
+    
+    The baseline mean and standard deviation are first estimated from a
+    calibration period and then follow slow changes with an exponential
+    moving average that only uses samples where the channel is at rest.
+    
+    All channels are handled at once with numpy operations; there is no
+    Python loop over channels or samples.
+    
+    Attributes:
+        sampling_rate (float): Sampling rate in Hz
+        envelope (str): 'rms' or 'tkeo'
+        on_factor (float): Onset threshold in baseline standard deviations
+        off_factor (float): Offset threshold in baseline standard deviations
+        baseline_mean (np.ndarray): Baseline envelope level per channel, None while calibrating
+        baseline_std (np.ndarray): Baseline envelope spread per channel, None while calibrating
+        active (np.ndarray): Current on/off state per channel, None while calibrating
+        samples_seen (int): Number of samples processed per channel
+    """
+    
+    def __init__(self, sampling_rate=2048, envelope='rms', envelope_window=0.05, on_factor=6.0,
+                 off_factor=3.0, calibration=1.0, baseline_window=5.0, dtype=None):
+        """
+        Initialize the onset detector.
+        
+        Args:
+            sampling_rate (float): Sampling rate in Hz (default: 2048)
+            envelope (str): 'rms' or 'tkeo' (default: 'rms')
+            envelope_window (float): Envelope smoothing window in seconds (default: 0.05)
+            on_factor (float): Onset threshold, baseline mean plus this many
+                standard deviations (default: 6.0)
+            off_factor (float): Offset threshold, must be below on_factor (default: 3.0)
+            calibration (float): Seconds of data used for the first baseline
+                estimate, no events are reported meanwhile (default: 1.0)
+            baseline_window (float): Time constant of the baseline update in seconds (default: 5.0)
+            dtype (optional): float32 or float64, None for the pipeline default
+        """
+        if envelope not in ('rms', 'tkeo'):
+            raise ValueError(f"envelope must be 'rms' or 'tkeo', got {envelope!r}")
+        if off_factor >= on_factor:
+            raise ValueError(f"off_factor ({off_factor}) must be below on_factor ({on_factor})")
+        
+        self.sampling_rate = sampling_rate
+        self.envelope = envelope
+        self.on_factor = on_factor
+        self.off_factor = off_factor
+        self.dtype = resolve_dtype(dtype)
+        
+        self._calibration_samples = max(int(calibration * sampling_rate), 1)
+        self._baseline_samples = baseline_window * sampling_rate
+        self._rms = StreamingRMS(max(int(envelope_window * sampling_rate), 1), dtype=self.dtype)
+        self.reset()
+    
+    def reset(self):
+        """
+        Forget the baseline and the state of all channels.
+        """
+        self._rms.reset()
+        self._previous = None
+        self._sum = None
+        self._sum_squares = None
+        self.baseline_mean = None
+        self.baseline_std = None
+        self.active = None
+        self.samples_seen = 0
+    
+    def process(self, chunk):
+        """
+        Process the next chunk of samples.
+        
+        Args:
+            chunk (np.ndarray): New samples, 1-D or (channels, samples)
+        
+        Returns:
+            np.ndarray: Events of EVENT_DTYPE in this chunk, ordered by sample
+        """
+        chunk = np.asarray(chunk, dtype=self.dtype)
+        envelope = self._envelope(chunk)
+        
+        if self.active is None:
+            self._calibrate(envelope)
+            return np.empty(0, dtype=EVENT_DTYPE)
+        
+        events = self._detect(envelope)
+        self.samples_seen += chunk.shape[-1]
+        return events
+    
+    def detect(self, data):
+        """
+        Detect all onsets and offsets of a complete recording.
+        
+        Args:
+            data (np.ndarray): Signal data, 1-D or (channels, samples)
+        
+        Returns:
+            np.ndarray: Events of EVENT_DTYPE, ordered by sample
+        """
+        self.reset()
+        self.process(data[..., :self._calibration_samples])
+        events = self.process(data[..., self._calibration_samples:])
+        self.reset()
+        return events
+    
+    def _envelope(self, chunk):
+        """
+        Compute the amplitude envelope of a chunk.
+        
+        Args:
+            chunk (np.ndarray): New samples, 1-D or (channels, samples)
+        
+        Returns:
+            np.ndarray: Envelope with the same shape as chunk
+        """
+        if self.envelope == 'rms':
+            return self._rms.process(chunk)
+        
+        # TKEO: psi[n] = x[n]^2 - x[n-1] * x[n+1], which needs one sample of
+        # look-ahead, so the output is delayed by one sample
+        if self._previous is None:
+            self._previous = np.zeros(chunk.shape[:-1] + (2,), dtype=self.dtype)
+        samples = np.concatenate((self._previous, chunk), axis=-1)
+        self._previous = samples[..., -2:].copy()
+        energy = samples[..., 1:-1] ** 2 - samples[..., :-2] * samples[..., 2:]
+        
+        # The RMS of sqrt(|psi|) is the square root of the mean energy,
+        # which keeps the envelope in signal units like the RMS envelope
+        return self._rms.process(np.sqrt(np.abs(energy)))
+    
+    def _calibrate(self, envelope):
+        """
+        Collect baseline statistics until the calibration period is over.
+        
+        Args:
+            envelope (np.ndarray): Envelope of the current chunk
+        """
+        if self._sum is None:
+            self._sum = np.zeros(envelope.shape[:-1])
+            self._sum_squares = np.zeros(envelope.shape[:-1])
+            self._count = 0
+        
+        # Skip the start, where the envelope window is still filling up
+        skip = max(self._rms.window_size - self.samples_seen, 0)
+        settled = envelope[..., skip:]
+        self._sum += settled.sum(axis=-1, dtype=np.float64)
+        self._sum_squares += np.square(settled, dtype=np.float64).sum(axis=-1)
+        self._count += settled.shape[-1]
+        self.samples_seen += envelope.shape[-1]
+        
+        if self.samples_seen >= self._calibration_samples and self._count:
+            self.baseline_mean = self._sum / self._count
+            variance = self._sum_squares / self._count - self.baseline_mean ** 2
+            self.baseline_std = np.sqrt(np.maximum(variance, 0))
+            self.active = np.zeros(envelope.shape[:-1], dtype=bool)
+    
+    def _detect(self, envelope):
+        """
+        Apply the hysteresis thresholds and update the baseline.
+        
+        Args:
+            envelope (np.ndarray): Envelope of the current chunk
+        
+        Returns:
+            np.ndarray: Events of EVENT_DTYPE in this chunk, ordered by sample
+        """
+        num_samples = envelope.shape[-1]
+        on_threshold = (self.baseline_mean + self.on_factor * self.baseline_std)[..., np.newaxis]
+        off_threshold = (self.baseline_mean + self.off_factor * self.baseline_std)[..., np.newaxis]
+        
+        # 1 = switch on, 0 = switch off, -1 = keep the previous state.
+        # The current state goes in front, then every sample takes the
+        # state of the last sample that decided (a vectorized forward fill).
+        decision = np.where(envelope > on_threshold, 1, np.where(envelope < off_threshold, 0, -1))
+        decision = np.concatenate((self.active[..., np.newaxis].astype(decision.dtype), decision), axis=-1)
+        positions = np.where(decision >= 0, np.arange(num_samples + 1), 0)
+        np.maximum.accumulate(positions, axis=-1, out=positions)
+        state = np.take_along_axis(decision, positions, axis=-1)
+        
+        self.active = state[..., -1].astype(bool)
+        events = self._events(np.diff(state, axis=-1), envelope)
+        self._update_baseline(envelope, state[..., 1:] == 0)
+        return events
+    
+    def _events(self, changes, envelope):
+        """
+        Turn state changes into event records.
+        
+        Args:
+            changes (np.ndarray): +1 at onsets, -1 at offsets, 0 elsewhere
+            envelope (np.ndarray): Envelope of the current chunk
+        
+        Returns:
+            np.ndarray: Events of EVENT_DTYPE, ordered by sample
+        """
+        changes = changes.reshape(-1, changes.shape[-1])
+        channels, samples = np.nonzero(changes)
+        
+        events = np.empty(len(samples), dtype=EVENT_DTYPE)
+        events['sample'] = self.samples_seen + samples
+        events['channel'] = channels
+        events['onset'] = changes[channels, samples] > 0
+        events['amplitude'] = envelope.reshape(changes.shape)[channels, samples]
+        return events[np.argsort(samples, kind='stable')]
+    
+    def _update_baseline(self, envelope, resting):
+        """
+        Move the baseline towards the resting samples of the current chunk.
+        
+        Args:
+            envelope (np.ndarray): Envelope of the current chunk
+            resting (np.ndarray): True where the channel is at rest
+        """
+        count = resting.sum(axis=-1)
+        if not count.any():
+            return
+        
+        safe_count = np.maximum(count, 1)
+        mean = np.where(resting, envelope, 0).sum(axis=-1, dtype=np.float64) / safe_count
+        mean_square = np.where(resting, np.square(envelope, dtype=np.float64), 0).sum(axis=-1) / safe_count
+        
+        # Exponential moving average; the weight grows with the number of
+        # resting samples, and channels without any stay unchanged
+        weight = 1 - np.exp(-count / self._baseline_samples)
+        old_mean_square = self.baseline_std ** 2 + self.baseline_mean ** 2
+        self.baseline_mean = self.baseline_mean + weight * (mean - self.baseline_mean)
+        new_mean_square = old_mean_square + weight * (mean_square - old_mean_square)
+        self.baseline_std = np.sqrt(np.maximum(new_mean_square - self.baseline_mean ** 2, 0))
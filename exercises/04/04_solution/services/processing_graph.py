@@ -0,0 +1,443 @@
+"""
+Composable processing graph that runs offline or on live packets.
+
+A graph is described once by chaining nodes, e.g.
+
+    source = Source(sampling_rate=2048)
+    filtered = source.bandpass(20, 450)
+    rms = filtered.rectify().rms(0.1).decimate(4)
+
+Describing the graph computes nothing. It is evaluated by one of two
+runners:
+
+- OfflineRunner(data).evaluate(rms) runs it on a complete recording.
+  Every node is computed at most once and cached, so evaluating `filtered`
+  and `rms` from the same runner filters the data only once.
+- OnlineRunner([filtered, rms]).process(packet) runs it on live chunks.
+  Stateful stages (filter, RMS, decimation) carry their state from one
+  chunk to the next, so the output equals the offline result.
+
+Consecutive elementwise stages (rectify, square, scale, ...) are fused:
+they are applied block by block, so each block of data stays in the CPU
+cache while all of them run, instead of one full pass over memory per
+stage.
+"""
+import numpy as np
+from services.dtype_policy import resolve_dtype
+from services.resampling import StreamingDecimator
+from services.signal_processor import StreamingRMS
+from services.streaming_filter import StreamingFilter
+from services.zero_phase import zero_phase_filter
+
+# Samples per block when running fused elementwise stages
+FUSED_BLOCK_SIZE = 16384
+
+
+class Node:
+    """
+    One step in a processing graph.
+    
+    Nodes are cheap, immutable descriptions. Use the methods below to add a
+    step after this one; they return the new node.
+    
+    Attributes:
+        parent (Node): The node this step reads from, None for the source
+        sampling_rate (float): Sampling rate of the output of this node in Hz
+        name (str): Short description, used in repr
+    """
+    
+    # Elementwise nodes are fused with their elementwise neighbours
+    elementwise = False
+    
+    def __init__(self, parent, sampling_rate, name):
+        self.parent = parent
+        self.sampling_rate = sampling_rate
+        self.name = name
+    
+    def __repr__(self):
+        chain = []
+        node = self
+        while node is not None:
+            chain.append(node.name)
+            node = node.parent
+        return ' -> '.join(reversed(chain))
+    
+    def bandpass(self, low_cut=20, high_cut=450, order=4, zero_phase=False):
+        """
+        Add a Butterworth bandpass filter.
+        
+        Args:
+            low_cut (float): Lower cutoff frequency in Hz (default: 20)
+            high_cut (float): Upper cutoff frequency in Hz (default: 450)
+            order (int): Filter order (default: 4)
+            zero_phase (bool): Filter forward and backward. Only possible
+                offline (default: False)
+        
+        Returns:
+            Node: The filter node
+        """
+        return FilterNode(self, 'bandpass', low_cut, high_cut, order, zero_phase)
+    
+    def highpass(self, cutoff, order=4, zero_phase=False):
+        """
+        Add a Butterworth highpass filter.
+        
+        Args:
+            cutoff (float): Cutoff frequency in Hz
+            order (int): Filter order (default: 4)
+            zero_phase (bool): Filter forward and backward. Only possible
+                offline (default: False)
+        
+        Returns:
+            Node: The filter node
+        """
+        return FilterNode(self, 'highpass', cutoff, None, order, zero_phase)
+    
+    def lowpass(self, cutoff, order=4, zero_phase=False):
+        """
+        Add a Butterworth lowpass filter.
+        
+        Args:
+            cutoff (float): Cutoff frequency in Hz
+            order (int): Filter order (default: 4)
+            zero_phase (bool): Filter forward and backward. Only possible
+                offline (default: False)
+        
+        Returns:
+            Node: The filter node
+        """
+        return FilterNode(self, 'lowpass', None, cutoff, order, zero_phase)
+    
+    def rectify(self):
+        """
+        Add full-wave rectification (absolute value).
+        
+        Returns:
+            Node: The rectification node
+        """
+        return ElementwiseNode(self, 'rectify', np.abs)
+    
+    def square(self):
+        """
+        Add squaring of every sample.
+        
+        Returns:
+            Node: The squaring node
+        """
+        return ElementwiseNode(self, 'square', np.square)
+    
+    def scale(self, gain):
+        """
+        Add multiplication by a constant.
+        
+        Args:
+            gain (float): Factor for every sample
+        
+        Returns:
+            Node: The scaling node
+        """
+        return ElementwiseNode(self, f'scale({gain})', np.multiply, gain)
+    
+    def rms(self, window):
+        """
+        Add a sliding RMS over the last `window` seconds.
+        
+        Args:
+            window (float): Window length in seconds
+        
+        Returns:
+            Node: The RMS node
+        """
+        return RMSNode(self, window)
+    
+    def decimate(self, factor, numtaps=None):
+        """
+        Add anti-aliased decimation.
+        
+        Args:
+            factor (int): Decimation factor
+            numtaps (int, optional): Number of FIR taps (default: 20 * factor + 1)
+        
+        Returns:
+            Node: The decimation node, at sampling_rate / factor
+        """
+        return DecimationNode(self, factor, numtaps)
+    
+    def create_engine(self, dtype, offline):
+        """
+        Create the object that computes this step.
+        
+        Args:
+            dtype (np.dtype): Processing dtype
+            offline (bool): True if the engine sees the whole recording at once
+        
+        Returns:
+            object: Anything with a process(chunk) method
+        """
+        raise NotImplementedError
+
+
+class Source(Node):
+    """
+    The input of a processing graph: raw samples, 1-D or (channels, samples).
+    """
+    
+    def __init__(self, sampling_rate=2048):
+        """
+        Args:
+            sampling_rate (float): Sampling rate of the input in Hz (default: 2048)
+        """
+        super().__init__(None, sampling_rate, 'source')
+
+
+class FilterNode(Node):
+    """
+    Butterworth filter step, causal or (offline only) zero-phase.
+    """
+    
+    def __init__(self, parent, btype, low_cut, high_cut, order, zero_phase):
+        band = {'bandpass': f'{low_cut}-{high_cut} Hz', 'lowpass': f'<{high_cut} Hz',
+                'highpass': f'>{low_cut} Hz'}[btype]
+        super().__init__(parent, parent.sampling_rate, f'{btype}({band})')
+        self.btype = btype
+        self.low_cut = low_cut
+        self.high_cut = high_cut
+        self.order = order
+        self.zero_phase = zero_phase
+    
+    def create_engine(self, dtype, offline):
+        if self.zero_phase:
+            if not offline:
+                raise ValueError(f"{self.name}: zero-phase filtering needs the whole recording")
+            return _ZeroPhaseEngine(self, dtype)
+        return StreamingFilter(self.low_cut, self.high_cut, self.order, self.sampling_rate, self.btype, dtype)
+
+
+class ElementwiseNode(Node):
+    """
+    Step that transforms every sample independently with a numpy ufunc.
+    """
+    
+    elementwise = True
+    
+    def __init__(self, parent, name, ufunc, *args):
+        super().__init__(parent, parent.sampling_rate, name)
+        self.ufunc = ufunc
+        self.args = args
+    
+    def apply(self, block):
+        """
+        Apply the step in place.
+        
+        Args:
+            block (np.ndarray): Samples, overwritten with the result
+        """
+        self.ufunc(block, *self.args, out=block)
+
+
+class RMSNode(Node):
+    """
+    Sliding RMS step.
+    """
+    
+    def __init__(self, parent, window):
+        super().__init__(parent, parent.sampling_rate, f'rms({window} s)')
+        self.window_size = max(int(round(window * parent.sampling_rate)), 1)
+    
+    def create_engine(self, dtype, offline):
+        return StreamingRMS(self.window_size, dtype)
+
+
+class DecimationNode(Node):
+    """
+    Anti-aliased decimation step.
+    """
+    
+    def __init__(self, parent, factor, numtaps):
+        super().__init__(parent, parent.sampling_rate / factor, f'decimate({factor})')
+        self.factor = factor
+        self.numtaps = numtaps
+    
+    def create_engine(self, dtype, offline):
+        return StreamingDecimator(self.factor, self.numtaps, dtype)
+
+
+class _ZeroPhaseEngine:
+    """
+    Adapter that gives zero_phase_filter the process(chunk) interface.
+    """
+    
+    def __init__(self, node, dtype):
+        self.node = node
+        self.dtype = dtype
+    
+    def process(self, data):
+        node = self.node
+        return zero_phase_filter(data, node.low_cut, node.high_cut, node.order, node.sampling_rate,
+                                 node.btype, dtype=self.dtype)
+
+
+class _Runner:
+    """
+    Shared evaluation logic of the offline and online runners.
+    """
+    
+    def __init__(self, dtype, offline):
+        self.dtype = resolve_dtype(dtype)
+        self._offline = offline
+        self._engines = {}
+    
+    def _evaluate(self, node, source, results):
+        """
+        Compute a node, reusing everything already in results.
+        
+        Args:
+            node (Node): Node to compute
+            source (np.ndarray): Input of the graph
+            results (dict): Node -> computed output, updated in place
+        
+        Returns:
+            np.ndarray: Output of the node
+        """
+        if node in results:
+            return results[node]
+        if node.parent is None:
+            results[node] = np.asarray(source, dtype=self.dtype)
+            return results[node]
+        
+        if node.elementwise:
+            # Collect the whole run of elementwise steps and fuse them
+            run = []
+            start = node
+            while start.elementwise and start not in results:
+                run.append(start)
+                start = start.parent
+            output = _apply_fused(self._evaluate(start, source, results), run[::-1])
+        else:
+            if node not in self._engines:
+                self._engines[node] = node.create_engine(self.dtype, self._offline)
+            data = self._evaluate(node.parent, source, results)
+            if data.shape[-1] == 0:
+                # A decimation stage had no output for this chunk; the
+                # stages after it have nothing to do and keep their state
+                output = data
+            else:
+                output = self._engines[node].process(data)
+        
+        results[node] = output
+        return output
+
+
+class OfflineRunner(_Runner):
+    """
+    Evaluates processing graphs on a complete recording, with caching.
+    
+    Every node is computed at most once per runner. The result of every
+    non-elementwise node is kept, so asking for a node that shares steps
+    with an earlier one only computes the new steps.
+    
+    Attributes:
+        data (np.ndarray): The recording, 1-D or (channels, samples)
+        dtype (np.dtype): Processing dtype
+    """
+    
+    def __init__(self, data, dtype=None):
+        """
+        Args:
+            data (np.ndarray): The recording, 1-D or (channels, samples)
+            dtype (optional): float32 or float64, None for the pipeline default
+        """
+        super().__init__(dtype, offline=True)
+        self.data = data
+        self._results = {}
+    
+    def evaluate(self, node):
+        """
+        Compute the output of a node.
+        
+        Args:
+            node (Node): Any node of a graph whose source matches the data
+        
+        Returns:
+            np.ndarray: Output of the node. Do not modify it, it is cached.
+        """
+        return self._evaluate(node, self.data, self._results)
+    
+    def invalidate(self):
+        """
+        Drop all cached results, e.g. after the data was changed in place.
+        """
+        self._results.clear()
+        self._engines.clear()
+
+
+class OnlineRunner(_Runner):
+    """
+    Evaluates processing graphs on live data, one chunk at a time.
+    
+    Every node is computed once per chunk, no matter how many outputs
+    depend on it. The output of every node for all chunks together equals
+    the OfflineRunner output for the whole signal.
+    
+    Attributes:
+        outputs (list): Nodes whose new samples are returned for every chunk
+        dtype (np.dtype): Processing dtype
+    """
+    
+    def __init__(self, outputs, dtype=None):
+        """
+        Args:
+            outputs (list): Nodes to compute for every chunk
+            dtype (optional): float32 or float64, None for the pipeline default
+        """
+        super().__init__(dtype, offline=False)
+        self.outputs = list(outputs)
+        
+        # Create all engines now, so graphs that cannot run online fail early
+        for output in self.outputs:
+            node = output
+            while node.parent is not None:
+                if not node.elementwise and node not in self._engines:
+                    self._engines[node] = node.create_engine(self.dtype, offline=False)
+                node = node.parent
+    
+    def process(self, chunk):
+        """
+        Push the next chunk through the graph.
+        
+        Args:
+            chunk (np.ndarray): New samples, 1-D or (channels, samples)
+        
+        Returns:
+            list: New output samples of every node in outputs, in order.
+                Decimated outputs can be empty for short chunks.
+        """
+        results = {}
+        return [self._evaluate(output, chunk, results) for output in self.outputs]
+    
+    def reset(self):
+        """
+        Forget the state of all stages. The next chunk starts a new signal.
+        """
+        for engine in self._engines.values():
+            engine.reset()
+
+
+def _apply_fused(data, steps):
+    """
+    Apply several elementwise steps in one pass over memory.
+    
+    Args:
+        data (np.ndarray): Input samples, not modified
+        steps (list): ElementwiseNodes in the order they are applied
+    
+    Returns:
+        np.ndarray: Result of all steps
+    """
+    output = np.empty_like(data)
+    for start in range(0, data.shape[-1], FUSED_BLOCK_SIZE):
+        block = output[..., start:start + FUSED_BLOCK_SIZE]
+        block[...] = data[..., start:start + FUSED_BLOCK_SIZE]
+        for step in steps:
+            step.apply(block)
+    return output
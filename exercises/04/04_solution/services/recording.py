@@ -0,0 +1,202 @@
+import pickle
+
+import numpy as np
+
+
+class Recording:
+    """
+    A multi-channel recording stored channel-major and contiguous.
+    
+    This class is part of the Model layer in the MVVM architecture. The
+    recordings come in the windowed layout (channels, window_size, windows).
+    A Recording rearranges them once, at load time, into one contiguous
+    (channels, samples) block, so every channel is a single run of memory.
+    After that, every access below returns a numpy view without copying:
+    
+    - channel(i) / channels(start, stop): rows of the block
+    - time_range(start, stop): columns between two times in seconds
+    - window(i) / windows(start, stop): columns of original windows
+    - as_windows(): the original (channels, window_size, windows) layout
+    
+    The data can also be a np.memmap, in which case nothing is read from
+    disk until a view is actually used.
+    
+    Attributes:
+        data (np.ndarray): Samples of shape (channels, samples), C-contiguous
+        sampling_rate (float): Sampling rate in Hz
+        window_size (int): Samples per original window (e.g. 18 per TCP packet)
+    """
+    
+    def __init__(self, data, sampling_rate, window_size=18):
+        """
+        Wrap channel-major data.
+        
+        Args:
+            data (np.ndarray): Samples of shape (channels, samples). Copied
+                once if it is not C-contiguous.
+            sampling_rate (float): Sampling rate in Hz
+            window_size (int): Samples per original window (default: 18)
+        """
+        if data.ndim != 2:
+            raise ValueError(f"Expected data of shape (channels, samples), got {data.shape}")
+        if not data.flags.c_contiguous:
+            data = np.ascontiguousarray(data)
+        
+        self.data = data
+        self.sampling_rate = sampling_rate
+        self.window_size = window_size
+    
+    @classmethod
+    def from_biosignal(cls, biosignal, sampling_rate, dtype=None):
+        """
+        Create a recording from the windowed (channels, window_size, windows) layout.
+        
+        This is the only place where the samples are copied.
+        
+        Args:
+            biosignal (np.ndarray): Data of shape (channels, window_size, windows)
+            sampling_rate (float): Sampling rate in Hz
+            dtype (optional): dtype of the stored samples (default: keep the input dtype)
+        
+        Returns:
+            Recording: The recording
+        """
+        num_channels, window_size, num_windows = biosignal.shape
+        
+        # (channels, windows, window_size) in memory order, then merge the last two axes
+        data = np.empty((num_channels, num_windows, window_size), dtype=dtype or biosignal.dtype)
+        data[...] = biosignal.transpose(0, 2, 1)
+        return cls(data.reshape(num_channels, num_windows * window_size), sampling_rate, window_size)
+    
+    @classmethod
+    def from_pickle(cls, pkl_file, dtype=None):
+        """
+        Load a recording from one of the course pickle files.
+        
+        Args:
+            pkl_file (str): Path of a file with 'biosignal' and 'device_information'
+            dtype (optional): dtype of the stored samples (default: keep the file dtype)
+        
+        Returns:
+            Recording: The recording
+        """
+        with open(pkl_file, 'rb') as f:
+            data = pickle.load(f)
+        return cls.from_biosignal(
+            np.asarray(data['biosignal']),
+            data['device_information']['sampling_frequency'],
+            dtype,
+        )
+    
+    @property
+    def num_channels(self):
+        return self.data.shape[0]
+    
+    @property
+    def num_samples(self):
+        return self.data.shape[1]
+    
+    @property
+    def num_windows(self):
+        return self.num_samples // self.window_size
+    
+    @property
+    def duration(self):
+        """Length of the recording in seconds."""
+        return self.num_samples / self.sampling_rate
+    
+    def channel(self, index):
+        """
+        Get one channel.
+        
+        Args:
+            index (int): Channel index (0-based)
+        
+        Returns:
+            np.ndarray: View of shape (samples,)
+        """
+        return self.data[index]
+    
+    def channels(self, start, stop):
+        """
+        Get a block of neighbouring channels.
+        
+        Args:
+            start (int): First channel (0-based)
+            stop (int): Channel after the last one
+        
+        Returns:
+            np.ndarray: View of shape (stop - start, samples)
+        """
+        return self.data[start:stop]
+    
+    def time_range(self, start, stop):
+        """
+        Get all channels between two points in time.
+        
+        Args:
+            start (float): Start time in seconds
+            stop (float): End time in seconds (exclusive)
+        
+        Returns:
+            np.ndarray: View of shape (channels, samples in range)
+        """
+        return self.data[:, self.sample_index(start):self.sample_index(stop)]
+    
+    def window(self, index):
+        """
+        Get one of the original windows (e.g. one TCP packet).
+        
+        Args:
+            index (int): Window index (0-based)
+        
+        Returns:
+            np.ndarray: View of shape (channels, window_size)
+        """
+        start = index * self.window_size
+        return self.data[:, start:start + self.window_size]
+    
+    def windows(self, start, stop):
+        """
+        Get a range of original windows as continuous samples.
+        
+        Args:
+            start (int): First window (0-based)
+            stop (int): Window after the last one
+        
+        Returns:
+            np.ndarray: View of shape (channels, (stop - start) * window_size)
+        """
+        return self.data[:, start * self.window_size:stop * self.window_size]
+    
+    def as_windows(self):
+        """
+        Get the data in the original (channels, window_size, windows) layout.
+        
+        Returns:
+            np.ndarray: Strided view of shape (channels, window_size, windows)
+        """
+        samples = self.num_windows * self.window_size
+        windowed = self.data[:, :samples].reshape(self.num_channels, self.num_windows, self.window_size)
+        return windowed.transpose(0, 2, 1)
+    
+    def sample_index(self, time):
+        """
+        Convert a time in seconds to a sample index.
+        
+        Args:
+            time (float): Time in seconds
+        
+        Returns:
+            int: Sample index, clipped to the recording
+        """
+        return min(max(int(round(time * self.sampling_rate)), 0), self.num_samples)
+    
+    def time_points(self):
+        """
+        Get the time of every sample in seconds.
+        
+        Returns:
+            np.ndarray: Array of shape (samples,)
+        """
+        return np.arange(self.num_samples) / self.sampling_rate
@@ -0,0 +1,197 @@
+import numpy as np
+from services.dtype_policy import resolve_dtype
+from services.filter_design import get_decimation_filter
+
+
+class StreamingDecimator:
+    """
+    Anti-aliased decimation by an integer factor for data arriving in chunks.
+    
+    The signal is lowpass filtered with an FIR filter and only every
+    `factor`-th sample is kept. This is done the polyphase way: the filter
+    output is only computed for the samples that are kept, so the work is
+    `factor` times smaller than filtering first and dropping samples after.
+    
+    The last numtaps - 1 input samples are carried between calls, so a
+    signal fed in chunks gives the same output as the whole signal at
+    once: signal.lfilter(taps, 1, x)[..., ::factor]. Like every causal
+    FIR filter it delays the signal by (numtaps - 1) / 2 input samples.
+    
+    Attributes:
+        factor (int): Decimation factor
+        taps (np.ndarray): FIR filter taps
+        dtype (np.dtype): dtype of the samples and the output
+        samples_seen (int): Number of input samples processed per channel
+    """
+    
+    def __init__(self, factor, numtaps=None, dtype=None):
+        """
+        Initialize the decimator.
+        
+        Args:
+            factor (int): Decimation factor
+            numtaps (int, optional): Number of filter taps (default: 20 * factor + 1)
+            dtype (optional): float32 or float64, None for the pipeline default
+        """
+        if factor < 1:
+            raise ValueError(f"factor must be at least 1, got {factor}")
+        
+        self.factor = int(factor)
+        self.taps = get_decimation_filter(self.factor, numtaps)
+        self.dtype = resolve_dtype(dtype)
+        
+        # Reversed taps, so every output sample is a dot product with a window
+        self._kernel = self.taps[::-1].astype(self.dtype)
+        self.reset()
+    
+    @property
+    def delay(self):
+        """
+        Group delay of the filter in input samples (rounded down for even numtaps).
+        """
+        return (len(self.taps) - 1) // 2
+    
+    def reset(self):
+        """
+        Forget all previous samples.
+        """
+        self._tail = None
+        self.samples_seen = 0
+    
+    def process(self, chunk):
+        """
+        Decimate the next chunk of samples.
+        
+        Args:
+            chunk (np.ndarray): New samples, 1-D or (channels, samples)
+        
+        Returns:
+            np.ndarray: Decimated samples, shape (*channels, kept_samples)
+        """
+        chunk = np.asarray(chunk, dtype=self.dtype)
+        if self._tail is None:
+            self._tail = np.zeros(chunk.shape[:-1] + (len(self.taps) - 1,), dtype=self.dtype)
+        samples = np.concatenate((self._tail, chunk), axis=-1)
+        
+        # Kept samples are those with a global index divisible by factor
+        first = -self.samples_seen % self.factor
+        kept = np.arange(first, chunk.shape[-1], self.factor)
+        
+        # Window number j ends at chunk sample j
+        windows = np.lib.stride_tricks.sliding_window_view(samples, len(self.taps), axis=-1)
+        output = windows[..., kept, :] @ self._kernel
+        
+        self._tail = samples[..., samples.shape[-1] - len(self.taps) + 1:].copy()
+        self.samples_seen += chunk.shape[-1]
+        return output
+
+
+class ResamplingPipeline:
+    """
+    A cascade of decimators that produces the signal at several rates.
+    
+    This class is part of the Model layer in the MVVM architecture. Every
+    stage decimates the output of the previous one, so e.g. factors
+    (4, 4, 4) at 2048 Hz give tiers at 2048, 512, 128 and 32 Hz. The
+    display or storage can then use the lowest rate that still has the
+    bandwidth it needs.
+    
+    Attributes:
+        sampling_rate (float): Input sampling rate in Hz
+        rates (list): Sampling rate of every tier in Hz, the input rate first
+        stages (list): One StreamingDecimator per decimation step
+        dtype (np.dtype): dtype of all tiers
+    """
+    
+    # Part of the new Nyquist band that is left untouched by the anti-aliasing filter
+    USABLE_BANDWIDTH = 0.8
+    
+    def __init__(self, sampling_rate=2048, factors=(4, 4, 4), dtype=None):
+        """
+        Initialize the pipeline.
+        
+        Args:
+            sampling_rate (float): Input sampling rate in Hz (default: 2048)
+            factors (sequence): Decimation factor of every stage (default: (4, 4, 4))
+            dtype (optional): float32 or float64, None for the pipeline default
+        """
+        self.sampling_rate = sampling_rate
+        self.dtype = resolve_dtype(dtype)
+        self.stages = [StreamingDecimator(factor, dtype=self.dtype) for factor in factors]
+        
+        self.rates = [sampling_rate]
+        for factor in factors:
+            self.rates.append(self.rates[-1] / factor)
+    
+    def reset(self):
+        """
+        Forget the state of all stages.
+        """
+        for stage in self.stages:
+            stage.reset()
+    
+    def process(self, chunk):
+        """
+        Push the next chunk through all stages.
+        
+        Args:
+            chunk (np.ndarray): New samples, 1-D or (channels, samples)
+        
+        Returns:
+            dict: Sampling rate in Hz -> new samples at that rate
+        """
+        chunk = np.asarray(chunk, dtype=self.dtype)
+        outputs = {self.rates[0]: chunk}
+        for rate, stage in zip(self.rates[1:], self.stages):
+            chunk = stage.process(chunk)
+            outputs[rate] = chunk
+        return outputs
+    
+    def run(self, data, compensate_delay=False):
+        """
+        Resample a complete recording.
+        
+        Live decimation has to be causal and delays every tier by the group
+        delay of its filters. With the whole recording available, the delay
+        can be removed: every stage gets its input advanced by its delay
+        (the end is padded with the last sample), so sample k of a tier
+        lines up with sample k * factor of the tier before it.
+        
+        Args:
+            data (np.ndarray): Signal data, 1-D or (channels, samples)
+            compensate_delay (bool): Remove the filter delay (default: False,
+                the same output as process())
+        
+        Returns:
+            dict: Sampling rate in Hz -> signal at that rate
+        """
+        self.reset()
+        if compensate_delay:
+            data = np.asarray(data, dtype=self.dtype)
+            outputs = {self.rates[0]: data}
+            for rate, stage in zip(self.rates[1:], self.stages):
+                delay = min(stage.delay, data.shape[-1])
+                padding = np.repeat(data[..., -1:], delay, axis=-1)
+                data = stage.process(np.concatenate((data[..., delay:], padding), axis=-1))
+                outputs[rate] = data
+        else:
+            outputs = self.process(data)
+        self.reset()
+        return outputs
+    
+    def rate_for_bandwidth(self, bandwidth):
+        """
+        Get the lowest tier rate that keeps a frequency band intact.
+        
+        Args:
+            bandwidth (float): Highest frequency that must be preserved in Hz
+        
+        Returns:
+            float: The sampling rate of the cheapest suitable tier
+        """
+        # Decimated tiers are usable up to part of their Nyquist frequency,
+        # the input tier up to its full Nyquist frequency
+        for rate in reversed(self.rates[1:]):
+            if bandwidth <= self.USABLE_BANDWIDTH * rate / 2:
+                return rate
+        return self.rates[0]
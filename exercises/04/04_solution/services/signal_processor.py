@@ -1,4 +1,5 @@
 import numpy as np
+from services.dtype_policy import resolve_dtype
 
 class SignalProcessor:
     """
@@ -13,42 +14,91 @@ class SignalProcessor:
         window_size (int): Size of the display window in seconds
         sampling_rate (int): Number of samples per second (Hz)
         points_per_window (int): Total number of points in the display window
+        dtype (np.dtype): dtype of generated and processed signals
     """
     
-    def __init__(self, window_size=10, sampling_rate=2048):
+    def __init__(self, window_size=10, sampling_rate=2048, dtype=None):
         """
         Initialize the signal processor with window and sampling parameters.
         
         Args:
             window_size (int): Size of the display window in seconds (default: 10)
             sampling_rate (int): Sampling rate in Hz (default: 2048)
+            dtype (optional): float32 or float64, None for the pipeline default
         """
         self.window_size = window_size
         self.sampling_rate = sampling_rate
         self.points_per_window = window_size * sampling_rate
+        self.dtype = resolve_dtype(dtype)
         
     def calculate_rms(self, data, window_size=None):
         """
         Calculate the Root Mean Square (RMS) of the signal.
         
+        Each output sample is the RMS of the last `window_size` input samples
+        (fewer at the start of the signal). The work is done by a
+        StreamingRMS engine, so the cost is O(N) instead of O(N * window_size).
+        
         Args:
-            data (np.ndarray): Input signal data
+            data (np.ndarray): Input signal data, 1-D or (channels, samples)
             window_size (int, optional): Size of the RMS window in samples
             
         Returns:
-            np.ndarray: RMS values
+            np.ndarray: RMS values with the same shape as data
         """
         if window_size is None:
             window_size = self.points_per_window
             
-        # Calculate RMS using rolling window
-        rms = np.zeros_like(data)
-        for i in range(len(data)):
-            start_idx = max(0, i - window_size + 1)
-            window = data[start_idx:i + 1]
-            rms[i] = np.sqrt(np.mean(window ** 2))
+        return StreamingRMS(window_size, self.dtype).process(data)
+    
+    def create_rms_stream(self, window_size=None):
+        """
+        Create a stateful RMS engine for live data.
+        
+        Feeding the returned engine one packet at a time gives the same
+        output as calculate_rms over the whole signal at once.
+        
+        Args:
+            window_size (int, optional): Size of the RMS window in samples
+            
+        Returns:
+            StreamingRMS: A fresh RMS engine
+        """
+        if window_size is None:
+            window_size = self.points_per_window
             
-        return rms
+        return StreamingRMS(window_size, self.dtype)
+    
+    def calculate_rms_envelopes(self, data, window_durations=(0.05, 0.1, 0.25, 0.5)):
+        """
+        Calculate RMS envelopes for several window lengths at once.
+        
+        The signal is squared once and a single cumulative sum is built;
+        every window length is then just a difference of that sum. This is
+        much cheaper than one convolution per window length and channel.
+        
+        Args:
+            data (np.ndarray): Input signal data, 1-D or (channels, samples)
+            window_durations (sequence): Window lengths in seconds
+                (default: 50, 100, 250 and 500 ms)
+            
+        Returns:
+            np.ndarray: RMS envelopes of shape (len(window_durations), *data.shape)
+        """
+        return self.create_rms_envelope_stream(window_durations).process(data)
+    
+    def create_rms_envelope_stream(self, window_durations=(0.05, 0.1, 0.25, 0.5)):
+        """
+        Create a stateful multi-scale RMS engine for live data.
+        
+        Args:
+            window_durations (sequence): Window lengths in seconds
+            
+        Returns:
+            MultiScaleRMS: A fresh engine
+        """
+        window_sizes = [max(1, int(round(d * self.sampling_rate))) for d in window_durations]
+        return MultiScaleRMS(window_sizes, self.dtype)
     
     def generate_test_signal(self, duration=60):
         """
@@ -76,4 +126,216 @@ class SignalProcessor:
         # Add small random noise for realism
         signal += np.random.normal(0, 0.2, len(t))
         
-        return t, signal
\ No newline at end of file
+        return t.astype(self.dtype), signal.astype(self.dtype)
+
+
+class StreamingRMS:
+    """
+    Sliding-window RMS engine with a running sum of squares.
+    
+    The engine keeps the last `window_size` squared samples in a ring buffer.
+    The samples that leave the window are exactly the ones that get
+    overwritten in the ring, so every new sample costs O(1) and whole
+    chunks are processed with vectorized numpy operations.
+    
+    Data can be 1-D (samples) or 2-D (channels, samples); the window always
+    runs along the last axis. State is kept between calls to process(), so
+    a signal fed in chunks (e.g. 32x18 TCP packets) gives the same output
+    as the whole signal at once.
+    
+    The squared samples and the output use the given dtype; the running
+    sum is always kept in float64.
+    
+    Attributes:
+        window_size (int): Size of the RMS window in samples
+        dtype (np.dtype): dtype of the squared samples and the output
+        samples_seen (int): Number of samples processed per channel so far
+    """
+    
+    def __init__(self, window_size, dtype=None):
+        """
+        Initialize the RMS engine.
+        
+        Args:
+            window_size (int): Size of the RMS window in samples
+            dtype (optional): float32 or float64, None for the pipeline default
+        """
+        if window_size < 1:
+            raise ValueError(f"window_size must be at least 1, got {window_size}")
+            
+        self.window_size = int(window_size)
+        self.dtype = resolve_dtype(dtype)
+        self.reset()
+        
+    def reset(self):
+        """
+        Forget all previous samples.
+        
+        The buffers are created again on the next call to process(), so the
+        engine can also be reused for data with a different channel count.
+        """
+        self.samples_seen = 0
+        self._ring = None
+        self._sum = None
+        
+    def process(self, data):
+        """
+        Process the next chunk of samples.
+        
+        Args:
+            data (np.ndarray): New samples, 1-D or (channels, samples)
+            
+        Returns:
+            np.ndarray: RMS value for every input sample, same shape as data
+        """
+        data = np.asarray(data)
+        if self._ring is None:
+            self._ring = np.zeros(data.shape[:-1] + (self.window_size,), dtype=self.dtype)
+            self._sum = np.zeros(data.shape[:-1])
+        elif data.shape[:-1] != self._ring.shape[:-1]:
+            raise ValueError(
+                f"Expected chunks with leading shape {self._ring.shape[:-1]}, got {data.shape[:-1]}"
+            )
+            
+        rms = np.empty(data.shape, dtype=self.dtype)
+        
+        # A block never wraps the ring more than once
+        for start in range(0, data.shape[-1], self.window_size):
+            block = data[..., start:start + self.window_size]
+            rms[..., start:start + block.shape[-1]] = self._process_block(block)
+            
+        return rms
+    
+    def _process_block(self, block):
+        """
+        Process a block of at most window_size samples.
+        
+        Args:
+            block (np.ndarray): New samples, at most window_size along the last axis
+            
+        Returns:
+            np.ndarray: RMS values for the block
+        """
+        n = block.shape[-1]
+        positions = (self.samples_seen + np.arange(n)) % self.window_size
+        
+        # Squared samples entering the window and the ones leaving it
+        # (the ring starts with zeros, so nothing leaves while it fills up)
+        squared = np.square(block, dtype=self.dtype)
+        leaving = self._ring[..., positions]
+        
+        # Running sum of squares for every new sample
+        change = squared.astype(np.float64) - leaving
+        sums = self._sum[..., np.newaxis] + np.cumsum(change, axis=-1)
+        
+        # Number of samples in the window (smaller until the window is full)
+        counts = np.minimum(self.samples_seen + np.arange(1, n + 1), self.window_size)
+        
+        self._ring[..., positions] = squared
+        self._sum = sums[..., -1]
+        self.samples_seen += n
+        
+        # Re-sum the ring once per wrap so rounding errors cannot accumulate
+        if positions[-1] == self.window_size - 1:
+            self._sum = self._ring.sum(axis=-1, dtype=np.float64)
+            
+        # Rounding can push a sum of squares slightly below zero
+        return np.sqrt(np.maximum(sums, 0.0) / counts)
+
+
+class MultiScaleRMS:
+    """
+    Sliding-window RMS for several window lengths from one cumulative sum.
+    
+    Each output sample is the RMS of the last window_size input samples
+    (fewer at the start), like StreamingRMS, but for every window length
+    in one pass. The last max(window_sizes) - 1 squared samples are kept
+    between calls, so a signal fed in chunks gives the same output as the
+    whole signal at once.
+    
+    Attributes:
+        window_sizes (list): Window lengths in samples
+        dtype (np.dtype): dtype of the output (the cumulative sum is float64)
+        samples_seen (int): Number of samples processed per channel so far
+    """
+    
+    def __init__(self, window_sizes, dtype=None):
+        """
+        Initialize the engine.
+        
+        Args:
+            window_sizes (sequence): Window lengths in samples
+            dtype (optional): float32 or float64, None for the pipeline default
+        """
+        if min(window_sizes) < 1:
+            raise ValueError(f"All window sizes must be at least 1, got {window_sizes}")
+            
+        self.window_sizes = [int(w) for w in window_sizes]
+        self._history = max(self.window_sizes) - 1
+        self.dtype = resolve_dtype(dtype)
+        self.reset()
+        
+    def reset(self):
+        """
+        Forget all previous samples.
+        """
+        self.samples_seen = 0
+        self._tail = None
+        
+    # Samples per cumulative sum. Long sums lose precision when the
+    # difference of two large partial sums is taken, so long inputs are
+    # processed in blocks that each start a fresh sum.
+    BLOCK_SIZE = 65536
+    
+    def process(self, data):
+        """
+        Process the next chunk of samples.
+        
+        Args:
+            data (np.ndarray): New samples, 1-D or (channels, samples)
+            
+        Returns:
+            np.ndarray: RMS envelopes of shape (len(window_sizes), *data.shape)
+        """
+        data = np.asarray(data)
+        if self._tail is None:
+            self._tail = np.zeros(data.shape[:-1] + (0,))
+            
+        envelopes = np.empty((len(self.window_sizes),) + data.shape, dtype=self.dtype)
+        for start in range(0, data.shape[-1], self.BLOCK_SIZE):
+            stop = start + self.BLOCK_SIZE
+            envelopes[..., start:stop] = self._process_block(data[..., start:stop])
+            
+        return envelopes
+    
+    def _process_block(self, data):
+        """
+        Process a block of samples with one cumulative sum.
+        
+        Args:
+            data (np.ndarray): New samples, 1-D or (channels, samples)
+            
+        Returns:
+            np.ndarray: RMS envelopes for the block
+        """
+        # Square once and build one cumulative sum over the kept tail and the new data
+        squared = np.concatenate((self._tail, np.square(data, dtype=np.float64)), axis=-1)
+        cumulative = np.zeros(squared.shape[:-1] + (squared.shape[-1] + 1,))
+        np.cumsum(squared, axis=-1, out=cumulative[..., 1:])
+        
+        n = data.shape[-1]
+        offset = self._tail.shape[-1]
+        
+        # Position of every new sample in the cumulative sum (one past its index)
+        ends = offset + np.arange(1, n + 1)
+        seen = self.samples_seen + np.arange(1, n + 1)
+        
+        envelopes = np.empty((len(self.window_sizes),) + data.shape)
+        for i, window_size in enumerate(self.window_sizes):
+            counts = np.minimum(seen, window_size)
+            sums = cumulative[..., ends] - cumulative[..., ends - counts]
+            envelopes[i] = np.sqrt(np.maximum(sums, 0.0) / counts)
+            
+        self._tail = squared[..., max(0, squared.shape[-1] - self._history):]
+        self.samples_seen += n
+        return envelopes
@@ -0,0 +1,96 @@
+from collections import OrderedDict
+
+from scipy import signal
+
+
+class SpectralAnalyzer:
+    """
+    Computes and caches Welch power spectra for all channels of a signal.
+    
+    This class is part of the Model layer in the MVVM architecture. The
+    spectra of all channels are computed together in one vectorized
+    signal.welch call along the last axis. The result is cached per
+    (array, nperseg, sampling_rate), so switching between channels of the
+    same signal is a simple lookup instead of a new computation.
+    
+    The cache identifies arrays by object identity, so it assumes the data
+    is not modified in place after its spectrum was computed. Call
+    invalidate() if it is.
+    
+    Attributes:
+        max_entries (int): Maximum number of cached spectra
+    """
+    
+    def __init__(self, max_entries=8):
+        """
+        Initialize the analyzer with an empty cache.
+        
+        Args:
+            max_entries (int): Maximum number of cached spectra (default: 8)
+        """
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+    
+    def welch(self, data, sampling_rate, nperseg=1024):
+        """
+        Get the Welch power spectral density of every channel.
+        
+        Args:
+            data (np.ndarray): Signal data, 1-D or (channels, samples)
+            sampling_rate (float): Sampling rate in Hz
+            nperseg (int): Length of each Welch segment in samples (default: 1024)
+        
+        Returns:
+            tuple: (frequencies, psd)
+                - frequencies: Array of frequencies in Hz
+                - psd: Power spectral density, shape (channels, frequencies)
+        """
+        key = (id(data), nperseg, sampling_rate)
+        entry = self._cache.get(key)
+        
+        # The stored array reference guards against a reused id()
+        if entry is not None and entry[0] is data:
+            self._cache.move_to_end(key)
+            return entry[1], entry[2]
+        
+        frequencies, psd = signal.welch(data, fs=sampling_rate, nperseg=nperseg, axis=-1)
+        
+        self._cache[key] = (data, frequencies, psd)
+        if len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        
+        return frequencies, psd
+    
+    def channel_welch(self, data, channel, sampling_rate, nperseg=1024):
+        """
+        Get the Welch power spectral density of a single channel.
+        
+        The first call computes the spectra of all channels; later calls for
+        any channel of the same data are answered from the cache.
+        
+        Args:
+            data (np.ndarray): Signal data of shape (channels, samples)
+            channel (int): Channel index (0-based)
+            sampling_rate (float): Sampling rate in Hz
+            nperseg (int): Length of each Welch segment in samples (default: 1024)
+        
+        Returns:
+            tuple: (frequencies, psd) of the selected channel
+        """
+        frequencies, psd = self.welch(data, sampling_rate, nperseg)
+        return frequencies, psd[channel]
+    
+    def invalidate(self, data=None):
+        """
+        Remove cached spectra.
+        
+        Args:
+            data (np.ndarray, optional): Only remove the spectra of this array.
+                If None, the whole cache is cleared.
+        """
+        if data is None:
+            self._cache.clear()
+            return
+        
+        for key in [k for k, entry in self._cache.items() if entry[0] is data]:
+            del self._cache[key]
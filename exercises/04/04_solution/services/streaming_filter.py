@@ -0,0 +1,82 @@
+import numpy as np
+from scipy import signal
+from services.dtype_policy import resolve_dtype
+from services.filter_design import filter_band, get_filter
+
+
+class StreamingFilter:
+    """
+    A Butterworth filter that processes live data chunk by chunk.
+    
+    This class is part of the Model layer in the MVVM architecture. It:
+    - Gets its filter in second-order-sections (SOS) form from the shared
+      filter design cache
+    - Filters all channels of a chunk in a single call
+    - Carries the filter state (zi) from one chunk to the next
+    
+    Because the state is carried over, filtering a signal in (32, 18)
+    packets gives the same result as filtering the whole signal at once
+    with signal.sosfilt. Unlike filtfilt this is a causal (forward only)
+    filter, so it can run on data that is still arriving.
+    
+    Attributes:
+        design (FilterDesign): The shared filter design
+        sos (np.ndarray): Filter coefficients in SOS form
+        sampling_rate (int): Sampling rate in Hz
+        dtype (np.dtype): dtype of the filtered data and the state
+        zi (np.ndarray): Current filter state, None before the first chunk
+    """
+    
+    def __init__(self, low_cut=20, high_cut=450, order=4, sampling_rate=2048, btype='bandpass',
+                 dtype=None):
+        """
+        Get the filter design.
+        
+        Args:
+            low_cut (float): Lower cutoff frequency in Hz (default: 20)
+            high_cut (float): Upper cutoff frequency in Hz (default: 450)
+            order (int): Order of the Butterworth filter (default: 4)
+            sampling_rate (int): Sampling rate in Hz (default: 2048)
+            btype (str): 'bandpass', 'bandstop', 'lowpass' or 'highpass'.
+                A lowpass uses only high_cut, a highpass only low_cut.
+            dtype (optional): float32 or float64, None for the pipeline default
+        """
+        self.sampling_rate = sampling_rate
+        self.design = get_filter(btype, order, filter_band(btype, low_cut, high_cut), sampling_rate)
+        self.dtype = resolve_dtype(dtype)
+        self.sos = self.design.sos_as(self.dtype)
+        self.zi = None
+    
+    def reset(self):
+        """
+        Forget the filter state. The next chunk starts a new signal.
+        """
+        self.zi = None
+    
+    def process(self, chunk):
+        """
+        Filter the next chunk of samples.
+        
+        On the first chunk the state is initialized to the steady state for
+        the first sample of each channel, which avoids a large start-up
+        transient when the signal has a DC offset.
+        
+        Args:
+            chunk (np.ndarray): New samples, 1-D or (channels, samples)
+        
+        Returns:
+            np.ndarray: Filtered samples with the same shape as chunk
+        """
+        chunk = np.asarray(chunk, dtype=self.dtype)
+        if chunk.shape[-1] == 0:
+            # Nothing to filter, e.g. after a decimation stage; keep the state
+            return chunk
+        if self.zi is None:
+            self.zi = self.design.initial_state(chunk[..., 0], self.dtype)
+        elif self.zi.shape[1:-1] != chunk.shape[:-1]:
+            raise ValueError(
+                f"Expected chunks with leading shape {self.zi.shape[1:-1]}, got {chunk.shape[:-1]}"
+            )
+        
+        filtered, self.zi = signal.sosfilt(self.sos, chunk, axis=-1, zi=self.zi)
+        return filtered
@@ -0,0 +1,150 @@
+import numpy as np
+from scipy import signal
+from services.dtype_policy import resolve_dtype
+
+
+class StreamingSTFT:
+    """
+    Short-time Fourier transform that is computed while the data arrives.
+    
+    This class is part of the Model layer in the MVVM architecture. Samples
+    are fed in chunks of any size with process(). Whenever enough samples
+    for a new frame are available, its power spectrum is computed and added
+    as a new column to the spectrogram. Past frames are never recomputed.
+    
+    Memory use is fixed: between calls only the samples that are still
+    needed for the next frame (less than nperseg per channel) are kept,
+    and the spectrogram history is a ring buffer of `history` columns.
+    
+    The columns are the same as those of
+    signal.spectrogram(x, fs, window, nperseg, noverlap=nperseg - hop, detrend=False)
+    (power spectral density, one-sided).
+    
+    Attributes:
+        nperseg (int): Frame length in samples
+        hop (int): Number of samples between the starts of two frames
+        sampling_rate (float): Sampling rate in Hz
+        channels (int, list or None): Channels to analyze, None for all
+        history (int): Number of spectrogram columns kept for display
+        frequencies (np.ndarray): Frequency of every spectrogram row in Hz
+        dtype (np.dtype): dtype of the samples and spectrogram columns
+    """
+    
+    def __init__(self, nperseg=256, hop=128, sampling_rate=2048, window='hann',
+                 channels=None, history=160, dtype=None):
+        """
+        Initialize the STFT stage.
+        
+        Args:
+            nperseg (int): Frame length in samples (default: 256)
+            hop (int): Samples between frame starts (default: 128, i.e. 50% overlap)
+            sampling_rate (float): Sampling rate in Hz (default: 2048)
+            window (str or tuple): Window function, see signal.get_window (default: 'hann')
+            channels (int, list or None): Channel index or list of channel
+                indices to analyze for (channels, samples) input.
+                None analyzes every channel (default: None)
+            history (int): Number of columns kept for display (default: 160)
+            dtype (optional): float32 or float64, None for the pipeline default
+        """
+        if not 0 < hop <= nperseg:
+            raise ValueError(f"hop must be between 1 and nperseg ({nperseg}), got {hop}")
+        
+        self.nperseg = nperseg
+        self.hop = hop
+        self.sampling_rate = sampling_rate
+        self.channels = channels
+        self.history = history
+        self.dtype = resolve_dtype(dtype)
+        self.frequencies = np.fft.rfftfreq(nperseg, d=1 / sampling_rate)
+        
+        window = signal.get_window(window, nperseg)
+        
+        # Density scaling of a one-sided spectrum, as used by signal.spectrogram
+        scale = np.full(len(self.frequencies), 2 / (sampling_rate * np.sum(window ** 2)))
+        scale[0] /= 2
+        if nperseg % 2 == 0:
+            scale[-1] /= 2
+        
+        self._window = window.astype(self.dtype)
+        self._scale = scale.astype(self.dtype)
+        
+        self.reset()
+    
+    def reset(self):
+        """
+        Forget all previous samples and spectrogram columns.
+        """
+        self._tail = None
+        self._columns = None
+        self._next_column = 0
+        self.frames_seen = 0
+    
+    def process(self, chunk):
+        """
+        Feed new samples and compute the spectra of all frames they complete.
+        
+        Args:
+            chunk (np.ndarray): New samples, 1-D or (channels, samples)
+        
+        Returns:
+            np.ndarray: New spectrogram columns, shape (*channels, frequencies, new_frames).
+                new_frames is 0 if the chunk did not complete a frame.
+        """
+        chunk = np.asarray(chunk, dtype=self.dtype)
+        if chunk.ndim > 1 and self.channels is not None:
+            chunk = chunk[self.channels]
+        
+        if self._tail is None:
+            self._tail = np.zeros(chunk.shape[:-1] + (0,), dtype=self.dtype)
+        samples = np.concatenate((self._tail, chunk), axis=-1)
+        
+        num_frames = 0
+        if samples.shape[-1] >= self.nperseg:
+            num_frames = (samples.shape[-1] - self.nperseg) // self.hop + 1
+        
+        # Only keep what is needed for the next frame
+        self._tail = samples[..., num_frames * self.hop:].copy()
+        
+        if num_frames == 0:
+            return np.zeros(chunk.shape[:-1] + (len(self.frequencies), 0), dtype=self.dtype)
+        
+        # (..., num_frames, nperseg) view of the frames, no copy
+        frames = np.lib.stride_tricks.sliding_window_view(samples, self.nperseg, axis=-1)
+        frames = frames[..., :num_frames * self.hop:self.hop, :]
+        
+        spectra = np.abs(np.fft.rfft(frames * self._window, axis=-1)) ** 2 * self._scale
+        columns = np.swapaxes(spectra, -1, -2)
+        
+        self._store(columns)
+        self.frames_seen += num_frames
+        return columns
+    
+    def spectrogram(self):
+        """
+        Get the spectrogram history, oldest column first.
+        
+        Columns that were not filled yet are zero.
+        
+        Returns:
+            np.ndarray: Spectrogram of shape (*channels, frequencies, history),
+                or None before the first complete frame
+        """
+        if self._columns is None:
+            return None
+        return np.roll(self._columns, -self._next_column, axis=-1)
+    
+    def _store(self, columns):
+        """
+        Write new columns into the history ring buffer.
+        
+        Args:
+            columns (np.ndarray): New columns, shape (*channels, frequencies, new_frames)
+        """
+        if self._columns is None:
+            self._columns = np.zeros(columns.shape[:-1] + (self.history,), dtype=self.dtype)
+        
+        # Only the newest `history` columns can survive
+        columns = columns[..., -self.history:]
+        positions = (self._next_column + np.arange(columns.shape[-1])) % self.history
+        self._columns[..., positions] = columns
+        self._next_column = (positions[-1] + 1) % self.history
@@ -0,0 +1,212 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy import signal
+from services.dtype_policy import resolve_dtype
+from services.filter_design import filter_band, get_filter
+
+
+def zero_phase_filter(data, low_cut=20, high_cut=450, order=4, sampling_rate=2048,
+                      btype='bandpass', workers=1, timings=None, dtype=None):
+    """
+    Zero-phase filter all channels of a recording at once.
+    
+    Instead of calling filtfilt once per channel in a Python loop, the whole
+    (channels, samples) block is filtered along the last axis with a single
+    call to signal.sosfiltfilt. With workers > 1 the channels are split into
+    groups that are filtered in a thread pool; SciPy releases the GIL while
+    filtering, so the groups really run in parallel.
+    
+    Args:
+        data (np.ndarray): Signal data, 1-D or (channels, samples)
+        low_cut (float): Lower cutoff frequency in Hz (default: 20)
+        high_cut (float): Upper cutoff frequency in Hz (default: 450)
+        order (int): Order of the Butterworth filter (default: 4)
+        sampling_rate (float): Sampling rate in Hz (default: 2048)
+        btype (str): 'bandpass', 'bandstop', 'lowpass' or 'highpass' (default: 'bandpass').
+            A lowpass uses only high_cut, a highpass only low_cut.
+        workers (int, optional): Number of threads. None uses one per CPU core.
+        timings (dict, optional): If given, filled with the duration in seconds
+            of each stage ('design', 'prepare', 'filter', 'total')
+        dtype (optional): dtype of the result, None for the pipeline default
+    
+    Returns:
+        np.ndarray: Filtered data with the same shape as data
+    """
+    start = time.perf_counter()
+    dtype = resolve_dtype(dtype)
+    
+    # Stage 1: get the (cached) filter design
+    design = get_filter(btype, order, filter_band(btype, low_cut, high_cut), sampling_rate)
+    design_done = time.perf_counter()
+    
+    # Stage 2: make the channels contiguous so every channel is one memory block
+    data = np.ascontiguousarray(data)
+    prepare_done = time.perf_counter()
+    
+    # Stage 3: filter
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or data.ndim < 2 or data.shape[0] < 2:
+        filtered = signal.sosfiltfilt(design.sos, data, axis=-1).astype(dtype, copy=False)
+    else:
+        filtered = _filter_in_threads(design.sos, data, workers, dtype)
+    filter_done = time.perf_counter()
+    
+    if timings is not None:
+        timings['design'] = design_done - start
+        timings['prepare'] = prepare_done - design_done
+        timings['filter'] = filter_done - prepare_done
+        timings['total'] = filter_done - start
+    
+    return filtered
+
+
+def _filter_in_threads(sos, data, workers, dtype):
+    """
+    Filter groups of channels in a thread pool.
+    
+    Args:
+        sos (np.ndarray): Filter coefficients in SOS form
+        data (np.ndarray): Signal data of shape (channels, samples)
+        workers (int): Number of threads
+        dtype: dtype of the result
+    
+    Returns:
+        np.ndarray: Filtered data
+    """
+    filtered = np.empty(data.shape, dtype=dtype)
+    groups = np.array_split(np.arange(data.shape[0]), min(workers, data.shape[0]))
+    
+    def filter_group(channels):
+        group = slice(channels[0], channels[-1] + 1)
+        filtered[group] = signal.sosfiltfilt(sos, data[group], axis=-1)
+    
+    with ThreadPoolExecutor(max_workers=len(groups)) as pool:
+        # list() re-raises any exception from the worker threads
+        list(pool.map(filter_group, groups))
+    
+    return filtered
+
+
+def chunked_zero_phase_filter(data, out, low_cut=20, high_cut=450, order=4,
+                              sampling_rate=2048, btype='bandpass', chunk_size=65536, dtype=None):
+    """
+    Zero-phase filter a recording that does not fit into memory.
+    
+    The recording is read and written in blocks of chunk_size samples, so
+    only a few blocks are in memory at any time. Works with np.memmap input
+    and output (or any array that supports slicing along the last axis).
+    
+    This is the same computation as signal.sosfiltfilt, split into chunks:
+    1. The signal is padded at both ends with an odd extension, exactly
+       like sosfiltfilt does
+    2. Forward pass: chunks are filtered from start to end, carrying the
+       filter state; the result is written into out
+    3. Backward pass: chunks of out are filtered from end to start,
+       carrying the state, and written back in place
+    Because the filter state is carried across chunk borders, the result
+    matches sosfiltfilt up to floating point rounding.
+    
+    Args:
+        data (np.ndarray): Input of shape (channels, samples), e.g. a np.memmap
+        out (np.ndarray or str): Output array with the same shape as data, or
+            a path where a new .npy file is created and memory-mapped
+        low_cut (float): Lower cutoff frequency in Hz (default: 20)
+        high_cut (float): Upper cutoff frequency in Hz (default: 450)
+        order (int): Order of the Butterworth filter (default: 4)
+        sampling_rate (float): Sampling rate in Hz (default: 2048)
+        btype (str): 'bandpass', 'bandstop', 'lowpass' or 'highpass' (default: 'bandpass').
+            A lowpass uses only high_cut, a highpass only low_cut.
+        chunk_size (int): Number of samples per chunk (default: 65536)
+        dtype (optional): dtype of a newly created output file, None for
+            the pipeline default. The filtering itself runs in float64.
+        
+    Returns:
+        np.ndarray: The filtered output (the memory-mapped file if out was a path)
+    """
+    design = get_filter(btype, order, filter_band(btype, low_cut, high_cut), sampling_rate)
+    sos = design.sos
+    num_samples = data.shape[-1]
+    
+    # Same edge padding length as sosfiltfilt uses by default
+    padlen = 3 * (2 * len(sos) + 1 - min((sos[:, 2] == 0).sum(), (sos[:, 5] == 0).sum()))
+    if num_samples <= padlen:
+        raise ValueError(f"The signal must be longer than {padlen} samples, got {num_samples}")
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be at least 1, got {chunk_size}")
+        
+    if isinstance(out, (str, os.PathLike)):
+        out = np.lib.format.open_memmap(out, mode='w+', dtype=resolve_dtype(dtype), shape=data.shape)
+    elif out.shape != data.shape:
+        raise ValueError(f"out must have shape {data.shape}, got {out.shape}")
+        
+    # Odd extension at both ends: 2 * x[0] - x[padlen:0:-1] and 2 * x[-1] - x[-2:-padlen-2:-1]
+    head = np.asarray(data[..., :padlen + 1], dtype=np.float64)
+    tail = np.asarray(data[..., -padlen - 1:], dtype=np.float64)
+    left_pad = 2 * head[..., :1] - head[..., :0:-1]
+    right_pad = 2 * tail[..., -1:] - tail[..., -2::-1]
+    
+    # Forward pass, starting in steady state for the first padded sample
+    _, zi = signal.sosfilt(sos, left_pad, axis=-1, zi=design.initial_state(left_pad[..., 0]))
+    for start in range(0, num_samples, chunk_size):
+        chunk = np.asarray(data[..., start:start + chunk_size], dtype=np.float64)
+        out[..., start:start + chunk_size], zi = signal.sosfilt(sos, chunk, axis=-1, zi=zi)
+    right_forward, zi = signal.sosfilt(sos, right_pad, axis=-1, zi=zi)
+    
+    # Backward pass over the reversed forward result
+    right_backward = right_forward[..., ::-1]
+    _, zi = signal.sosfilt(sos, right_backward, axis=-1,
+                           zi=design.initial_state(right_backward[..., 0]))
+    for stop in range(num_samples, 0, -chunk_size):
+        start = max(0, stop - chunk_size)
+        chunk = np.asarray(out[..., start:stop], dtype=np.float64)[..., ::-1]
+        filtered, zi = signal.sosfilt(sos, chunk, axis=-1, zi=zi)
+        out[..., start:stop] = filtered[..., ::-1]
+        
+    if isinstance(out, np.memmap):
+        out.flush()
+        
+    return out
+
+
+def compare_with_loop(data, sampling_rate=2048, workers=None):
+    """
+    Time the per-channel filtfilt loop against the batched filter.
+    
+    Args:
+        data (np.ndarray): Signal data of shape (channels, samples)
+        sampling_rate (float): Sampling rate in Hz (default: 2048)
+        workers (int, optional): Threads for the parallel run (default: one per core)
+    
+    Returns:
+        dict: Duration in seconds of 'loop', 'batched' and 'threaded' filtering
+    """
+    design = get_filter('bandpass', 4, (20, 450), sampling_rate)
+    results = {}
+    
+    # The original approach: one filtfilt call per channel
+    start = time.perf_counter()
+    looped = np.zeros(data.shape)
+    for i in range(data.shape[0]):
+        looped[i, :] = signal.sosfiltfilt(design.sos, data[i, :])
+    results['loop'] = time.perf_counter() - start
+    
+    timings = {}
+    zero_phase_filter(data, sampling_rate=sampling_rate, workers=1, timings=timings)
+    results['batched'] = timings['total']
+    
+    zero_phase_filter(data, sampling_rate=sampling_rate, workers=workers, timings=timings)
+    results['threaded'] = timings['total']
+    
+    return results
+
+
+if __name__ == '__main__':
+    # Benchmark on 10 minutes of 32-channel noise
+    # Run from the 04_solution folder with: python -m services.zero_phase
+    test_data = np.random.randn(32, 10 * 60 * 2048)
+    for method, seconds in compare_with_loop(test_data).items():
+        print(f"{method:>10}: {seconds:.3f} s")
@@ -1,6 +1,7 @@
-from PyQt5.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QPushButton
+from PyQt5.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QPushButton, QLabel
 from PyQt5.QtCore import Qt
 from .plotView import VisPyPlotWidget
+from .spectrogramView import SpectrogramWidget
 
 class MainView(QMainWindow):
     """
@@ -14,6 +15,8 @@ class MainView(QMainWindow):
     
     The window provides a simple interface with:
     - A plot widget showing the live signal
+    - A spectrogram of the signal shown in the plot
+    - A label showing whether the muscle is active
     - A button to start/stop the plotting
     """
     
@@ -29,7 +32,7 @@ class MainView(QMainWindow):
         
         # Set up the main window
         self.setWindowTitle("Live RMS Plot")
-        self.setGeometry(100, 100, 800, 500)
+        self.setGeometry(100, 100, 800, 700)
         
         # Create central widget and layout
         central_widget = QWidget()
@@ -40,6 +43,14 @@ class MainView(QMainWindow):
         self.plot_widget = VisPyPlotWidget()
         layout.addWidget(self.plot_widget)
         
+        # Create spectrogram widget
+        self.spectrogram_widget = SpectrogramWidget()
+        layout.addWidget(self.spectrogram_widget)
+        
+        # Create muscle activity label
+        self.activity_label = QLabel("Muscle at rest")
+        layout.addWidget(self.activity_label)
+        
         # Create control button
         self.control_button = QPushButton("Start Plotting")
         self.control_button.clicked.connect(self.toggle_plotting)
@@ -47,6 +58,20 @@ class MainView(QMainWindow):
         
         # Connect view model signals
         self.view_model.data_updated.connect(self.plot_widget.update_data)
+        self.view_model.spectrogram_updated.connect(self.spectrogram_widget.update_spectrogram)
+        self.view_model.events_detected.connect(self.update_activity)
+        
+    def update_activity(self, events):
+        """
+        Show the state after the last onset/offset event.
+        
+        Args:
+            events (np.ndarray): Onset/offset records, ordered by sample
+        """
+        last = events[-1]
+        seconds = last['sample'] / self.view_model.signal_processor.sampling_rate
+        state = "active" if last['onset'] else "at rest"
+        self.activity_label.setText(f"Muscle {state} since {seconds:.2f} s")
         
     def toggle_plotting(self):
         """
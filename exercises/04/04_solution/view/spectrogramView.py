@@ -0,0 +1,57 @@
+from PyQt5.QtWidgets import QWidget, QVBoxLayout
+from vispy import scene
+import numpy as np
+
+class SpectrogramWidget(QWidget):
+    """
+    A widget that displays a live spectrogram using VisPy.
+    
+    This class is part of the View layer in the MVVM architecture. It:
+    - Creates and manages the VisPy canvas
+    - Shows the spectrogram as an image (time on x, frequency on y)
+    - Converts the power values to decibels for display
+    
+    The spectrogram itself is computed in the Model layer; this widget
+    only displays what the ViewModel sends.
+    """
+    
+    def __init__(self, parent=None):
+        """
+        Initialize the spectrogram widget with VisPy canvas and view.
+        
+        Args:
+            parent: Parent widget (optional)
+        """
+        super().__init__(parent)
+        
+        # Create layout
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+        
+        # Create VisPy canvas
+        self.canvas = scene.SceneCanvas(keys='interactive', size=(800, 200))
+        layout.addWidget(self.canvas.native)
+        
+        # Create view
+        self.view = self.canvas.central_widget.add_view()
+        self.view.camera = 'panzoom'
+        
+        # Create image, rows are frequencies and columns are frames
+        self.image = scene.visuals.Image(np.zeros((1, 1), dtype=np.float32), cmap='viridis',
+                                         parent=self.view.scene)
+    
+    def update_spectrogram(self, spectrogram):
+        """
+        Update the image with a new spectrogram.
+        
+        Args:
+            spectrogram (np.ndarray): Power values of shape (frequencies, frames)
+        """
+        # Convert to decibels, the small offset avoids log(0) for empty columns
+        image = (10 * np.log10(spectrogram + 1e-12)).astype(np.float32)
+        self.image.set_data(image)
+        self.image.clim = (image.max() - 80, image.max())
+        
+        # Fit the view to the image
+        self.view.camera.set_range(x=(0, image.shape[1]), y=(0, image.shape[0]), margin=0)
+        self.canvas.update()
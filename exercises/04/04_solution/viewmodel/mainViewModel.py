@@ -1,6 +1,9 @@
 from PyQt5.QtCore import QObject, pyqtSignal, QTimer
 import numpy as np
 from services.signal_processor import SignalProcessor
+from services.streaming_stft import StreamingSTFT
+from services.resampling import ResamplingPipeline
+from services.onset_detection import OnsetDetector
 
 class MainViewModel(QObject):
     """
@@ -10,14 +13,20 @@ class MainViewModel(QObject):
     - Manages the signal data and its updates
     - Controls the plotting state (start/stop)
     - Handles the timing of updates
+    - Feeds newly shown samples into a streaming spectrogram
+    - Detects muscle onsets and offsets in the newly shown samples
     - Emits signals to update the view
     
     Signals:
         data_updated: Emitted when new data is available for plotting
+        spectrogram_updated: Emitted with the spectrogram of the last 10 seconds
+        events_detected: Emitted with the onset/offset events of the new samples
     """
     
     # Signals for the view to connect to
     data_updated = pyqtSignal(np.ndarray, np.ndarray)  # time, data
+    spectrogram_updated = pyqtSignal(np.ndarray)  # (frequencies, frames) power
+    events_detected = pyqtSignal(np.ndarray)  # records of EVENT_DTYPE
     
     def __init__(self):
         """
@@ -27,7 +36,10 @@ class MainViewModel(QObject):
         - Signal processor with 10s window and 2048 Hz sampling
         - Timer for 30 Hz updates
         - Initial data generation
+        - Decimated copy of the signal for display
         - Fixed time window for display
+        - Streaming spectrogram covering the display window
+        - Onset detector on the RMS envelope
         """
         super().__init__()
         self.signal_processor = SignalProcessor(window_size=10, sampling_rate=2048)
@@ -39,8 +51,32 @@ class MainViewModel(QObject):
         self.current_index = 0
         self.is_plotting = False
         
+        # The plot is only about 800 pixels wide, so 20480 points per frame
+        # cannot be seen anyway. Display an anti-aliased copy at 1/8 of the rate.
+        # The whole signal is known, so the filter delay is removed and the
+        # trace lines up with the spectrogram and the detected onsets.
+        self.display_factor = 8
+        resampler = ResamplingPipeline(self.signal_processor.sampling_rate, factors=(self.display_factor,))
+        self.display_data = resampler.run(self.raw_data, compensate_delay=True)[resampler.rates[-1]]
+        self.display_points = self.signal_processor.points_per_window // self.display_factor
+        
         # Create fixed time window (0 to 10 seconds)
-        self.fixed_time_window = np.linspace(0, 10, self.signal_processor.points_per_window)
+        self.fixed_time_window = np.linspace(0, 10, self.display_points, dtype=self.signal_processor.dtype)
+        
+        # Streaming spectrogram: 256-sample frames every 128 samples,
+        # enough history columns to cover the 10 second display window
+        hop = 128
+        self.stft = StreamingSTFT(
+            nperseg=256,
+            hop=hop,
+            sampling_rate=self.signal_processor.sampling_rate,
+            history=self.signal_processor.points_per_window // hop,
+        )
+        # Index up to which samples were fed into the spectrogram
+        self.stft_index = 0
+        
+        # Onset detection, fed with the same new samples as the spectrogram
+        self.onset_detector = OnsetDetector(sampling_rate=self.signal_processor.sampling_rate)
         
         # Set update interval to 30 Hz
         self.timer.setInterval(33)  # 1000ms/30Hz ≈ 33ms
@@ -74,29 +110,47 @@ class MainViewModel(QObject):
         Update the data window and emit new data.
         
         This method is called by the timer at 30 Hz. It:
-        - Gets the current window of data
+        - Gets the current window of the decimated display data
         - Pads with zeros if needed
         - Emits the new data for plotting
+        - Feeds the newly shown samples into the spectrogram and the onset detector
         - Updates the current index
         - Resets if we reach the end
         """
         window_size = self.signal_processor.points_per_window
         end_idx = min(self.current_index + window_size, len(self.time_points))
         
-        # Get the current window of data
-        data_window = self.raw_data[self.current_index:end_idx]
+        # Get the current window of the display data
+        display_start = self.current_index // self.display_factor
+        data_window = self.display_data[display_start:display_start + self.display_points]
         
         # If we don't have enough data to fill the window, pad with zeros
-        if len(data_window) < window_size:
-            data_window = np.pad(data_window, (0, window_size - len(data_window)))
+        if len(data_window) < self.display_points:
+            data_window = np.pad(data_window, (0, self.display_points - len(data_window)))
         
         # Emit the fixed time window and the shifted data
         self.data_updated.emit(self.fixed_time_window, data_window)
         
+        # Only the samples that entered the window since the last update are
+        # new for the spectrogram; older frames are never recomputed
+        if end_idx > self.stft_index:
+            new_samples = self.raw_data[self.stft_index:end_idx]
+            self.stft.process(new_samples)
+            events = self.onset_detector.process(new_samples)
+            if len(events):
+                self.events_detected.emit(events)
+            self.stft_index = end_idx
+            spectrogram = self.stft.spectrogram()
+            if spectrogram is not None:
+                self.spectrogram_updated.emit(spectrogram)
+        
         # Update the current index (move by 1/30th of a second worth of samples)
         self.current_index += self.signal_processor.sampling_rate // 30
         
         # Reset if we reach the end
         if self.current_index >= len(self.time_points) - window_size:
             self.current_index = 0
+            self.stft.reset()
+            self.onset_detector.reset()
+            self.stft_index = 0
             
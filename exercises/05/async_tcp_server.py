@@ -0,0 +1,140 @@
+import asyncio
+import time
+
+from pacing import PacketPacer
+from protocol import FRAME_HEADER, HELLO, HELLO_TIMEOUT, VERSION, hello, pack_header, parse_hello
+from tcp_server import DEFAULT_PKL_FILE, EMGTCPServer
+
+
+class AsyncEMGTCPServer(EMGTCPServer):
+    """
+    Replay server that serves all clients from one asyncio event loop.
+
+    The threaded EMGTCPServer runs a separate loop per client, which slices,
+    converts and paces every packet again for every client. Here a single
+    pacing task produces each packet once and writes the same bytes to
+    all connected clients, so:
+    - hundreds of local clients fit on one core
+    - all clients see the same packet at the same time, like a real device
+    - clients that connect later join the running stream
+
+    Clients that negotiate the framed protocol (see protocol.py) get the
+    same packets with a frame header; its sequence number is shared by
+    all clients, so a late client starts at a sequence number above 0.
+
+    Writes are buffered by asyncio and never awaited per client, so one
+    slow client cannot hold up the others. A client whose send buffer grows
+    above MAX_CLIENT_BUFFER bytes is disconnected.
+    """
+
+    # About 1 second of packets
+    MAX_CLIENT_BUFFER = 256 * 1024
+
+    def __init__(self, host='localhost', port=12345, pkl_file=DEFAULT_PKL_FILE, pacing_policy='burst',
+                 log_level='INFO', dump_every=0):
+        super().__init__(host, port, pkl_file, pacing_policy, log_level, dump_every)
+        self.pacer = None
+        self.writers = {}
+        self.framed_writers = set()
+        self.sequence = 0
+        self.window_index = 0
+
+    async def serve(self):
+        """Accept clients and stream packets until stop() is called"""
+        self.server_socket = await asyncio.start_server(self.handle_client, self.host, self.port)
+        self.running = True
+        print(f"Async server started on {self.host}:{self.port}")
+
+        async with self.server_socket:
+            await self.broadcast()
+
+        for writer in list(self.writers):
+            self.remove_client(writer, 'server stopped')
+        self.telemetry.close()
+        print("Server stopped")
+
+    async def handle_client(self, reader, writer):
+        """Register a new client; the pacing task does all the sending"""
+        try:
+            data = await asyncio.wait_for(reader.readexactly(HELLO.size), HELLO_TIMEOUT)
+            framed = parse_hello(data) == VERSION
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            framed = False
+        if framed:
+            writer.write(hello())
+            self.framed_writers.add(writer)
+        stats = self.telemetry.client_connected(writer.get_extra_info('peername'), self.pacer)
+        self.writers[writer] = stats
+        self.telemetry.event('negotiated', client=stats.name, framed=framed)
+        try:
+            # Clients send nothing after the hello; this returns when they disconnect
+            await reader.read()
+        except ConnectionError:
+            pass
+        finally:
+            self.remove_client(writer)
+
+    def remove_client(self, writer, reason='closed'):
+        """Forget a client and close its connection"""
+        stats = self.writers.pop(writer, None)
+        self.framed_writers.discard(writer)
+        if stats is not None:
+            writer.close()
+            self.telemetry.client_disconnected(stats, reason)
+
+    async def broadcast(self):
+        """The single pacing task: send every packet once to all clients"""
+        num_windows = self.emg_signal.shape[2]
+        self.pacer = pacer = PacketPacer(self.sampling_rate, self.SAMPLES_PER_PACKET, self.pacing_policy)
+        stream_start = time.time()
+        channels, samples = self.packets.shape[1:]
+
+        while self.running:
+            # Wait for the deadline of the packet; with the skip policy,
+            # packets we are too late for are left out
+            skipped = await pacer.wait_async()
+            self.window_index = (self.window_index + skipped) % num_windows
+            self.sequence += skipped
+            self.telemetry.dump_packet(self.window_index, self.packets)
+            # One pre-serialized buffer shared by all clients, nothing is copied here
+            data_bytes = self.packet_views[self.window_index]
+            if self.framed_writers:
+                # The header is packed once per packet, for all framed clients
+                header = pack_header(self.sequence, stream_start + self.sequence * pacer.interval, channels,
+                                     samples, self.packets.dtype, self.packet_size)
+
+            for writer, stats in list(self.writers.items()):
+                queued = writer.transport.get_write_buffer_size()
+                if queued > self.MAX_CLIENT_BUFFER:
+                    self.remove_client(writer, 'too slow')
+                    continue
+                if writer in self.framed_writers:
+                    writer.writelines((header, data_bytes))
+                    stats.packet_sent(FRAME_HEADER.size + self.packet_size, queued)
+                else:
+                    writer.write(data_bytes)
+                    stats.packet_sent(self.packet_size, queued)
+
+            pacer.packet_sent()
+            self.window_index += 1
+            self.sequence += 1
+            # loop around if we reach the end of the data
+            if self.window_index >= num_windows:
+                self.window_index = 0
+                self.telemetry.event('restart')
+
+    def start(self):
+        """Run the server in the current thread until stop() or Ctrl+C"""
+        asyncio.run(self.serve())
+
+    def stop(self):
+        """Stop streaming; serve() then closes all connections"""
+        self.running = False
+
+
+if __name__ == "__main__":
+    server = AsyncEMGTCPServer()
+    try:
+        server.start()
+    except KeyboardInterrupt:
+        print("\nShutting down server...")
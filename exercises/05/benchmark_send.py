@@ -0,0 +1,107 @@
+"""
+Compare the two ways of putting a packet on the wire.
+
+    tobytes:    emg_signal[..., i].tobytes(), a strided slice copied into a
+                new bytes object for every packet (how the servers used to send)
+    memoryview: a slice of the contiguous packet buffer made once at load
+                time (EMGTCPServer.prepare_packets), no copy per packet
+
+Packets are sent unpaced over a local socket pair, a receiver thread
+drains the other end. The sender's CPU time (time.thread_time) gives
+packets/s per core, i.e. how many packet streams one core could serve.
+
+Usage (from the folder of this file):
+    python benchmark_send.py [RECORDING.pkl|RECORDING.emg] [PACKETS]
+Without a recording, random data of the usual shape is used.
+"""
+import socket
+import sys
+import threading
+import time
+
+import numpy as np
+
+from emg_format import EMGRecording
+
+
+def load_signal(path):
+    """(channels, samples, windows) signal from a recording, or random data"""
+    if path is None:
+        return np.random.default_rng(0).standard_normal((32, 18, 6826), dtype=np.float32)
+    if path.endswith('.emg'):
+        return np.asarray(EMGRecording(path).as_windows()[:32])
+    import pickle
+    with open(path, 'rb') as f:
+        return pickle.load(f)['biosignal'][:32]
+
+
+def drain(sock):
+    """Receive until the sender closes its end"""
+    buffer = bytearray(1 << 20)
+    while sock.recv_into(buffer):
+        pass
+
+
+def run(send_all, num_packets):
+    """Time send_all(sock, num_packets); returns (wall seconds, sender CPU seconds)"""
+    sender, receiver = socket.socketpair()
+    receiver_thread = threading.Thread(target=drain, args=(receiver,))
+    receiver_thread.start()
+    
+    wall = time.perf_counter()
+    cpu = time.thread_time()
+    send_all(sender, num_packets)
+    cpu = time.thread_time() - cpu
+    wall = time.perf_counter() - wall
+    
+    sender.close()
+    receiver_thread.join()
+    receiver.close()
+    return wall, cpu
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else None
+    num_packets = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+    emg_signal = load_signal(path)
+    num_windows = emg_signal.shape[2]
+    
+    # The same layout as EMGTCPServer.prepare_packets
+    packets = np.ascontiguousarray(emg_signal.transpose(2, 0, 1))
+    packet_size = packets[0].nbytes
+    buffer = memoryview(packets).cast('B')
+    packet_views = [buffer[i * packet_size:(i + 1) * packet_size] for i in range(num_windows)]
+    assert packet_views[5] == emg_signal[..., 5].tobytes()
+    
+    def send_tobytes(sock, n):
+        for i in range(n):
+            sock.sendall(emg_signal[..., i % num_windows].tobytes())
+    
+    def send_memoryview(sock, n):
+        for i in range(n):
+            sock.sendall(packet_views[i % num_windows])
+    
+    def prepare_tobytes(n):
+        for i in range(n):
+            emg_signal[..., i % num_windows].tobytes()
+    
+    def prepare_memoryview(n):
+        for i in range(n):
+            packet_views[i % num_windows]
+    
+    print(f"{num_packets} packets of {packet_size} bytes")
+    print(f"{'method':<12}{'prepare only':>18}{'sent packets/s':>18}{'per core':>18}")
+    for name, send_all, prepare in (('tobytes', send_tobytes, prepare_tobytes),
+                                    ('memoryview', send_memoryview, prepare_memoryview)):
+        start = time.perf_counter()
+        prepare(num_packets)
+        prepare_rate = num_packets / (time.perf_counter() - start)
+        wall, cpu = run(send_all, num_packets)
+        print(f"{name:<12}{prepare_rate:>16.0f}/s{num_packets / wall:>16.0f}/s{num_packets / cpu:>16.0f}/s")
+    
+    # One client needs sampling_rate / samples_per_packet packets per second
+    print(f"(a 2048 Hz stream is {2048 / 18:.1f} packets/s)")
+
+
+if __name__ == "__main__":
+    main()
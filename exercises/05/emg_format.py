@@ -0,0 +1,263 @@
+"""
+Raw binary format for EMG recordings, opened with np.memmap.
+
+Unpickling recording.pkl loads the whole recording into RAM before
+anything can be done with it, cannot seek, and runs arbitrary code from
+the file. A .emg file instead is:
+
+    bytes 0 - 7        magic b'EMGRAW01'
+    bytes 8 - 4095     JSON header, UTF-8, padded with spaces
+    bytes 4096 - end   samples, little-endian float32, no gaps
+
+The header holds everything needed to interpret the samples:
+
+    {
+        "version": 1,
+        "dtype": "<f4",
+        "sampling_frequency": 2048,
+        "channels": 32,
+        "window_size": 18,
+        "windows": 6826,
+        "layout": "channel_major"
+    }
+
+layout is one of
+    "channel_major": shape (channels, windows * window_size); every
+        channel is one contiguous run of samples. Written by the converter,
+        best for analysis of single channels.
+    "packet_major": shape (windows, channels, window_size); every
+        (channels, window_size) packet is contiguous. Best for appending
+        packets while they arrive.
+
+Opening a file only reads the 4 KiB header; the samples are mapped into
+memory and the operating system reads a page from disk the first time it
+is touched. select() / load() cut out channels and a time range without
+touching the rest, e.g. one channel of a long session:
+
+    load('session.emg', channels=5, start=60, stop=70)  # 10 s of channel 5
+
+Convert a pickle recording (from the folder of this file):
+    python emg_format.py recording.pkl recording.emg [channel_major|packet_major]
+The replay servers send packet_major files straight from the memory map;
+channel_major files (the default, best for analysis) are copied into
+memory in packet order when the server starts.
+"""
+import json
+import os
+import pickle
+import sys
+
+import numpy as np
+
+MAGIC = b'EMGRAW01'
+HEADER_SIZE = 4096
+VERSION = 1
+DTYPE = np.dtype('<f4')
+LAYOUTS = ('channel_major', 'packet_major')
+
+
+def write_header(f, header):
+    """Write the magic and the JSON header to the start of an open binary file"""
+    text = json.dumps(header, indent=2).encode('utf-8')
+    if len(MAGIC) + len(text) > HEADER_SIZE:
+        raise ValueError(f"Header is larger than {HEADER_SIZE} bytes")
+    f.seek(0)
+    f.write(MAGIC + text.ljust(HEADER_SIZE - len(MAGIC)))
+
+
+def read_header(path):
+    """Read the JSON header of a .emg file"""
+    with open(path, 'rb') as f:
+        block = f.read(HEADER_SIZE)
+    if len(block) < HEADER_SIZE or not block.startswith(MAGIC):
+        raise ValueError(f"{path} is not an EMG raw file")
+    header = json.loads(block[len(MAGIC):].decode('utf-8'))
+    if header.get('version') != VERSION:
+        raise ValueError(f"{path} has unsupported version {header.get('version')}")
+    if header['layout'] not in LAYOUTS:
+        raise ValueError(f"{path} has unknown layout {header['layout']!r}")
+    return header
+
+
+def sample_shape(header):
+    """Shape of the sample block described by a header"""
+    if header['layout'] == 'channel_major':
+        return (header['channels'], header['windows'] * header['window_size'])
+    return (header['windows'], header['channels'], header['window_size'])
+
+
+def create(path, sampling_frequency, channels, window_size, windows, layout='channel_major'):
+    """Create a .emg file of the given size and return it opened for writing"""
+    header = {
+        'version': VERSION,
+        'dtype': DTYPE.str,
+        # .item() turns numpy scalars from the pickle files into JSON-friendly numbers
+        'sampling_frequency': np.asarray(sampling_frequency).item(),
+        'channels': int(channels),
+        'window_size': int(window_size),
+        'windows': int(windows),
+        'layout': layout,
+    }
+    if layout not in LAYOUTS:
+        raise ValueError(f"layout must be one of {LAYOUTS}, got {layout!r}")
+    with open(path, 'wb') as f:
+        write_header(f, header)
+        f.truncate(HEADER_SIZE + int(np.prod(sample_shape(header))) * DTYPE.itemsize)
+    return EMGRecording(path, mode='r+')
+
+
+class EMGRecording:
+    """
+    A recording in the .emg format, memory-mapped from disk.
+    
+    Attributes:
+        path (str): Path of the file
+        header (dict): The JSON header
+        samples (np.memmap): All samples, shape as given by the layout
+        sampling_rate (float): Sampling rate in Hz
+        num_channels (int): Number of channels
+        window_size (int): Samples per window (packet)
+        num_windows (int): Number of windows
+    """
+    
+    def __init__(self, path, mode='r'):
+        """Open a .emg file; mode 'r' for read only, 'r+' to change samples"""
+        self.path = path
+        self.header = read_header(path)
+        self.sampling_rate = self.header['sampling_frequency']
+        self.num_channels = self.header['channels']
+        self.window_size = self.header['window_size']
+        self.num_windows = self.header['windows']
+        self.layout = self.header['layout']
+        self.samples = np.memmap(path, dtype=np.dtype(self.header['dtype']), mode=mode,
+                                 offset=HEADER_SIZE, shape=sample_shape(self.header))
+    
+    def as_windows(self):
+        """View of all samples as (channels, window_size, windows), like data['biosignal']"""
+        if self.layout == 'channel_major':
+            windowed = self.samples.reshape(self.num_channels, self.num_windows, self.window_size)
+            return windowed.transpose(0, 2, 1)
+        return self.samples.transpose(1, 2, 0)
+    
+    def window(self, index):
+        """View of one window (packet) as (channels, window_size)"""
+        if self.layout == 'channel_major':
+            start = index * self.window_size
+            return self.samples[:, start:start + self.window_size]
+        return self.samples[index]
+    
+    def select(self, channels=None, start=None, stop=None, unit='seconds'):
+        """
+        Get some channels in a time range as (channels, samples).
+        
+        channels can be an index (gives a 1-D array), a slice or a list of
+        indices (None for all). start and stop are in seconds or, with unit='windows', in
+        window indices (None for the start/end of the recording).
+        
+        In the channel_major layout an index, a slice or a list of
+        neighbouring channels gives a view of the file, so only the
+        selected bytes are ever read. Other lists and the packet_major
+        layout give a copy of just the selected samples.
+        """
+        first, last = self._sample_range(start, stop, unit)
+        rows = self._channel_rows(channels)
+        
+        if self.layout == 'channel_major':
+            return self.samples[rows, first:last]
+        
+        # Only whole windows can be cut from the packet_major block
+        first_window = first // self.window_size
+        last_window = -(-last // self.window_size)
+        offset = first_window * self.window_size
+        packets = self.samples[first_window:last_window][:, rows]
+        if packets.ndim == 2:
+            # A single channel: (windows, window_size)
+            return packets.reshape(-1)[first - offset:last - offset]
+        selected = packets.transpose(1, 0, 2).reshape(packets.shape[1], -1)
+        return selected[:, first - offset:last - offset]
+    
+    def _sample_range(self, start, stop, unit):
+        """Convert start/stop in seconds or windows to sample indices"""
+        if unit == 'seconds':
+            scale = self.sampling_rate
+        elif unit == 'windows':
+            scale = self.window_size
+        else:
+            raise ValueError(f"unit must be 'seconds' or 'windows', got {unit!r}")
+        
+        num_samples = self.num_windows * self.window_size
+        first = 0 if start is None else min(max(int(round(start * scale)), 0), num_samples)
+        last = num_samples if stop is None else min(max(int(round(stop * scale)), first), num_samples)
+        return first, last
+    
+    def _channel_rows(self, channels):
+        """Turn a channel selection into an index that keeps views where possible"""
+        if channels is None:
+            return slice(None)
+        if isinstance(channels, (int, np.integer, slice)):
+            return channels
+        channels = [int(c) for c in channels]
+        for c in channels:
+            if not -self.num_channels <= c < self.num_channels:
+                raise IndexError(f"Channel {c} is out of range for {self.num_channels} channels")
+        # Negative indices count from the end, like for a single index
+        channels = [c % self.num_channels for c in channels]
+        if channels and channels == list(range(channels[0], channels[-1] + 1)):
+            # Neighbouring channels: a slice gives a view instead of a copy
+            return slice(channels[0], channels[-1] + 1)
+        return channels
+    
+    def flush(self):
+        """Write changed samples to disk"""
+        self.samples.flush()
+    
+    def close(self):
+        """Release the memory map (it is unmapped once no views are left)"""
+        self.samples = None
+
+
+def load(path, channels=None, start=None, stop=None, unit='seconds'):
+    """Open a .emg file and select channels and a time range (see EMGRecording.select)"""
+    return EMGRecording(path).select(channels, start, stop, unit)
+
+
+def convert_pickle(pkl_file, emg_file, block_windows=4096, layout='channel_major'):
+    """
+    Convert a pickle recording ('biosignal', 'device_information') to .emg.
+    
+    The samples are written in the given layout, a block of windows at a
+    time, so no second full copy of the recording is made in memory.
+    """
+    with open(pkl_file, 'rb') as f:
+        data = pickle.load(f)
+    biosignal = np.asarray(data['biosignal'])
+    channels, window_size, windows = biosignal.shape
+    
+    # Write into a temporary file first, so a failed conversion leaves nothing behind
+    temp_file = emg_file + '.part'
+    recording = create(temp_file, data['device_information']['sampling_frequency'],
+                       channels, window_size, windows, layout)
+    try:
+        for start in range(0, windows, block_windows):
+            stop = min(start + block_windows, windows)
+            if layout == 'packet_major':
+                recording.samples[start:stop] = biosignal[:, :, start:stop].transpose(2, 0, 1)
+            else:
+                block = biosignal[:, :, start:stop].transpose(0, 2, 1).reshape(channels, -1)
+                recording.samples[:, start * window_size:stop * window_size] = block
+        recording.flush()
+    finally:
+        recording.close()
+    os.replace(temp_file, emg_file)
+    return EMGRecording(emg_file)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (3, 4):
+        print("Usage: python emg_format.py RECORDING.pkl RECORDING.emg [channel_major|packet_major]")
+        sys.exit(1)
+    layout = sys.argv[3] if len(sys.argv) == 4 else 'channel_major'
+    converted = convert_pickle(sys.argv[1], sys.argv[2], layout=layout)
+    print(f"Converted {sys.argv[1]} -> {sys.argv[2]} ({layout})")
+    print(f"{converted.num_channels} channels, {converted.num_windows} windows of "
+          f"{converted.window_size} samples, {converted.sampling_rate} Hz")
@@ -0,0 +1,237 @@
+"""
+Append-only, crash-safe recording of live EMG packets.
+
+EMGRecorder stores every received (channels, window_size) packet in a
+.emg file with the packet_major layout (see emg_format.py), next to an
+index file <name>.emg.idx with one record per packet:
+
+    window     int64    position of the packet in the .emg file
+    sequence   int64    sequence number of the packet
+    timestamp  float64  time.time() when the packet was received
+
+The receive loop only puts packets into a queue; a background thread
+does all file work, so recording never blocks receiving. If the queue is
+full (the disk cannot keep up), packets are dropped and counted instead.
+
+The sample file is pre-allocated and doubled in size when it is full.
+Every `sync_interval` seconds the writer thread makes the new data
+durable in this order:
+
+    1. samples (memmap flush)   2. index (fsync)   3. header 'windows' (fsync)
+
+The header count is only raised after the samples and the index are on
+disk, so after a crash the file is always consistent up to that count:
+EMGRecording can open it directly, and EMGRecorder(..., resume=True)
+drops the unsynced tail and continues appending.
+"""
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from emg_format import DTYPE, HEADER_SIZE, EMGRecording, create, read_header, write_header
+
+INDEX_DTYPE = np.dtype([('window', '<i8'), ('sequence', '<i8'), ('timestamp', '<f8')])
+
+
+def read_index(emg_file):
+    """Read the packet index of a recorded .emg file (only the synced part)"""
+    windows = read_header(emg_file)['windows']
+    index = np.fromfile(emg_file + '.idx', dtype=INDEX_DTYPE)
+    return index[:windows]
+
+
+class EMGRecorder:
+    """
+    Records live packets to disk in a background thread.
+    
+    Attributes:
+        path (str): Path of the .emg file
+        windows_written (int): Packets written to the file so far
+        windows_synced (int): Packets that are safely on disk
+        dropped (int): Packets dropped because the queue was full
+        error (Exception): Why the writer thread stopped, None while it works
+    """
+    
+    def __init__(self, path, sampling_rate=2048, channels=32, window_size=18, initial_windows=65536,
+                 sync_interval=1.0, queue_size=8192, resume=False):
+        """
+        Create (or with resume=True, continue) a recording.
+        
+        initial_windows is the number of packets space is allocated for at
+        the start; the file grows by doubling. sync_interval is the time in
+        seconds between two syncs to disk.
+        """
+        self.path = path
+        self.index_path = path + '.idx'
+        self.sync_interval = sync_interval
+        self.dropped = 0
+        self.error = None
+        
+        if resume and os.path.exists(path):
+            header = read_header(path)
+            if header['layout'] != 'packet_major':
+                raise ValueError(f"{path} was not written by a recorder")
+            self.channels = header['channels']
+            self.window_size = header['window_size']
+            self.windows_synced = header['windows']
+            self._recover()
+        else:
+            self.channels = channels
+            self.window_size = window_size
+            self.windows_synced = 0
+            create(path, sampling_rate, channels, window_size, initial_windows, layout='packet_major').close()
+            self._set_header_windows(0)
+            open(self.index_path, 'wb').close()
+        
+        self.windows_written = self.windows_synced
+        self._open_samples()
+        self._index_file = open(self.index_path, 'ab')
+        
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+    
+    def add(self, packet, sequence=None, timestamp=None):
+        """Queue a (channels, window_size) packet for writing; never blocks"""
+        if self.error is not None:
+            raise RuntimeError(f"Recording to {self.path} failed: {self.error}") from self.error
+        if np.shape(packet) != (self.channels, self.window_size):
+            raise ValueError(
+                f"Expected a packet of shape {(self.channels, self.window_size)}, got {np.shape(packet)}"
+            )
+        if timestamp is None:
+            timestamp = time.time()
+        try:
+            self._queue.put_nowait((packet, sequence, timestamp))
+        except queue.Full:
+            self.dropped += 1
+    
+    def close(self):
+        """Write all queued packets, sync and close the files"""
+        if self._stopping:
+            return
+        self._stopping = True
+        # The writer thread may have died with a full queue; never wait for it then
+        while self._thread.is_alive():
+            try:
+                self._queue.put(None, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+        self._thread.join()
+        
+        if self.error is None:
+            self._sync()
+        self._index_file.close()
+        self._samples = None
+        
+        # Cut off the unused pre-allocated space
+        with open(self.path, 'r+b') as f:
+            f.truncate(HEADER_SIZE + self.windows_synced * self._window_bytes)
+        if self.dropped:
+            print(f"Recorder: {self.dropped} packets were dropped")
+        if self.error is not None:
+            print(f"Recorder: writing failed, only the first {self.windows_synced} packets were saved: {self.error}")
+    
+    def _run(self):
+        """Writer thread; stores the exception that stops it in self.error"""
+        try:
+            self._write_loop()
+        except Exception as e:
+            self.error = e
+    
+    def _write_loop(self):
+        """Take packets from the queue and sync regularly"""
+        last_sync = time.monotonic()
+        index = []
+        while True:
+            try:
+                item = self._queue.get(timeout=self.sync_interval)
+            except queue.Empty:
+                item = False
+            
+            if item:
+                packet, sequence, timestamp = item
+                if self.windows_written == len(self._samples):
+                    self._grow()
+                self._samples[self.windows_written] = packet
+                if sequence is None:
+                    sequence = self.windows_written
+                index.append((self.windows_written, sequence, timestamp))
+                self.windows_written += 1
+            
+            if item is None or time.monotonic() - last_sync >= self.sync_interval:
+                if index:
+                    self._index_file.write(np.array(index, dtype=INDEX_DTYPE).tobytes())
+                    index = []
+                if item is not None:
+                    self._sync()
+                last_sync = time.monotonic()
+            if item is None:
+                return
+    
+    def _sync(self):
+        """Make all written packets durable: samples, then index, then header"""
+        if self.windows_written == self.windows_synced:
+            return
+        self._samples.flush()
+        self._index_file.flush()
+        os.fsync(self._index_file.fileno())
+        self._set_header_windows(self.windows_written)
+        self.windows_synced = self.windows_written
+    
+    def _set_header_windows(self, windows):
+        """Update the committed packet count in the header"""
+        header = read_header(self.path)
+        header['windows'] = windows
+        with open(self.path, 'r+b') as f:
+            write_header(f, header)
+            f.flush()
+            os.fsync(f.fileno())
+    
+    @property
+    def _window_bytes(self):
+        return self.channels * self.window_size * DTYPE.itemsize
+    
+    def _open_samples(self):
+        """Map the whole allocated sample block, committed or not"""
+        capacity = (os.path.getsize(self.path) - HEADER_SIZE) // self._window_bytes
+        self._samples = np.memmap(self.path, dtype=DTYPE, mode='r+', offset=HEADER_SIZE,
+                                  shape=(capacity, self.channels, self.window_size))
+    
+    def _grow(self):
+        """Double the allocated space of the sample file"""
+        self._samples.flush()
+        capacity = max(len(self._samples) * 2, 1)
+        self._samples = None
+        with open(self.path, 'r+b') as f:
+            f.truncate(HEADER_SIZE + capacity * self._window_bytes)
+        self._open_samples()
+    
+    def _recover(self):
+        """Drop everything after the last sync, left over from a crash"""
+        index_size = self.windows_synced * INDEX_DTYPE.itemsize
+        with open(self.index_path, 'r+b') as f:
+            f.truncate(min(index_size, os.path.getsize(self.index_path)))
+        if os.path.getsize(self.index_path) != index_size:
+            raise ValueError(f"{self.index_path} is shorter than the synced recording")
+
+
+if __name__ == "__main__":
+    # Record a few seconds of random packets and read them back
+    import tempfile
+    path = os.path.join(tempfile.gettempdir(), 'recorder_demo.emg')
+    recorder = EMGRecorder(path, initial_windows=16)
+    start = time.perf_counter()
+    for i in range(1000):
+        recorder.add(np.full((32, 18), i, dtype=np.float32))
+    print(f"Queued 1000 packets in {(time.perf_counter() - start) * 1000:.1f} ms")
+    recorder.close()
+    
+    recording = EMGRecording(path)
+    print(f"Recorded {recording.num_windows} packets, index has {len(read_index(path))} entries")
@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+POLICIES = ('burst', 'skip')
+
+
+class PacketPacer:
+    """
+    Paces packets on fixed deadlines so the long-term rate is exact.
+
+    Sleeping for one packet interval after doing the work of a packet makes
+    every packet a bit late, and the error adds up: the real rate is always
+    below the device rate. Instead, packet n (counting from 0) is due at
+
+        start + (n + 1) * SAMPLES_PER_PACKET / sampling_rate
+
+    on the time.monotonic clock, like a device that sends a packet as soon
+    as its samples are recorded, and the pacer only sleeps until that
+    deadline. Work time and sleep inaccuracy no longer accumulate.
+
+    If the sender falls behind (e.g. the process was stalled), the policy
+    decides how to catch up:
+    - 'burst': send the missed packets back to back, no data is lost
+    - 'skip':  drop the missed packets and continue with the packet that is
+               due now, so the stream stays aligned with the clock
+
+    Call wait() (or await wait_async()) before every packet. It returns how
+    many packets to skip, which is always 0 for the burst policy. Call
+    packet_sent() after the packet went out, so achieved_rate() only counts
+    delivered packets and never exceeds the sampling rate.
+    """
+
+    def __init__(self, sampling_rate, samples_per_packet=18, policy='burst'):
+        """Create a pacer for packets of samples_per_packet samples"""
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}, got {policy!r}")
+        self.sampling_rate = sampling_rate
+        self.samples_per_packet = samples_per_packet
+        self.interval = samples_per_packet / sampling_rate
+        self.policy = policy
+        self.start()
+
+    def start(self):
+        """Start counting from now; the first packet is due after one interval"""
+        self.start_time = time.monotonic()
+        self.next_deadline = self.start_time + self.interval
+        self.packets_sent = 0
+        self.packets_skipped = 0
+
+    def wait(self):
+        """Sleep until the next packet is due; returns the number of packets to skip"""
+        delay, skipped = self._schedule()
+        if delay > 0:
+            time.sleep(delay)
+        return skipped
+
+    async def wait_async(self):
+        """Like wait(), for asyncio code"""
+        delay, skipped = self._schedule()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return skipped
+
+    def _schedule(self):
+        """Book the next packet; returns (seconds to sleep, packets to skip)"""
+        delay = self.next_deadline - time.monotonic()
+        skipped = 0
+        if self.policy == 'skip' and -delay >= self.interval:
+            # Jump to the packet that is due now
+            skipped = int(-delay / self.interval)
+            self.next_deadline += skipped * self.interval
+            self.packets_skipped += skipped
+
+        self.next_deadline += self.interval
+        return delay, skipped
+
+    def packet_sent(self):
+        """Count a packet once it is sent"""
+        self.packets_sent += 1
+
+    def achieved_rate(self):
+        """Delivered samples per second per channel since start()"""
+        elapsed = time.monotonic() - self.start_time
+        if elapsed <= 0:
+            return 0.0
+        return self.packets_sent * self.samples_per_packet / elapsed
+
+    def lag(self):
+        """Seconds the sender is behind schedule (0 if on time)"""
+        return max(0.0, time.monotonic() - self.next_deadline)
@@ -0,0 +1,158 @@
+"""
+Framed wire protocol between the replay servers and the clients.
+
+Without framing the stream is just 2304-byte packets back to back: a
+receiver cannot tell where a packet starts, whether one was lost or what
+shape it has. In the framed protocol every packet is preceded by a
+32-byte little-endian header:
+
+    offset  size  field
+    0       4     magic b'EMGF'
+    4       1     version (1)
+    5       1     dtype code, see DTYPE_CODES
+    6       2     reserved (0)
+    8       8     sequence     uint64, packet number on the device clock
+    16      8     timestamp    float64, Unix time of the first sample
+    24      2     channels
+    26      2     samples per channel in this packet
+    28      4     payload length in bytes
+
+followed by the payload, (channels, samples) samples in C order.
+
+The sequence number counts packet slots of the device, so a gap in the
+sequence means packets were lost or skipped; a wrong magic means the
+receiver lost track of the frame boundaries.
+
+Negotiation: right after connecting, a client that speaks this protocol
+sends a hello (b'EMGH', version, 3 zero bytes). The server answers with
+its own hello and sends frames from then on. A client that sends nothing
+within HELLO_TIMEOUT seconds gets the old raw stream, so existing
+clients keep working. A client that does not get a hello back from an
+old server falls back to raw packets.
+"""
+import socket
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+MAGIC = b'EMGF'
+HELLO_MAGIC = b'EMGH'
+VERSION = 1
+HELLO_TIMEOUT = 0.5
+
+FRAME_HEADER = struct.Struct('<4sBB2xQdHHI')
+HELLO = struct.Struct('<4sB3x')
+
+DTYPE_CODES = {'<f4': 1, '<f8': 2, '<i2': 3, '<i4': 4}
+CODE_DTYPES = {code: np.dtype(name) for name, code in DTYPE_CODES.items()}
+
+FrameHeader = namedtuple('FrameHeader', 'sequence timestamp channels samples dtype payload_length')
+
+
+class ProtocolError(Exception):
+    """The received bytes are not a valid frame"""
+
+
+def pack_header(sequence, timestamp, channels, samples, dtype, payload_length):
+    """Header bytes of one frame"""
+    code = DTYPE_CODES.get(np.dtype(dtype).str)
+    if code is None:
+        raise ValueError(f"dtype {dtype} cannot be sent, use one of {list(DTYPE_CODES)}")
+    return FRAME_HEADER.pack(MAGIC, VERSION, code, sequence, timestamp, channels, samples, payload_length)
+
+
+def unpack_header(data):
+    """Parse and check the header bytes of one frame"""
+    magic, version, code, sequence, timestamp, channels, samples, payload_length = FRAME_HEADER.unpack(data)
+    if magic != MAGIC:
+        raise ProtocolError(f"Bad frame magic {bytes(magic)!r}, the stream is misaligned")
+    if version != VERSION:
+        raise ProtocolError(f"Unsupported frame version {version}")
+    if code not in CODE_DTYPES:
+        raise ProtocolError(f"Unknown dtype code {code}")
+    dtype = CODE_DTYPES[code]
+    if payload_length != channels * samples * dtype.itemsize:
+        raise ProtocolError(f"Payload length {payload_length} does not match {channels}x{samples} {dtype}")
+    return FrameHeader(sequence, timestamp, channels, samples, dtype, payload_length)
+
+
+def hello(version=VERSION):
+    """The hello message both sides send during negotiation"""
+    return HELLO.pack(HELLO_MAGIC, version)
+
+
+def parse_hello(data):
+    """Protocol version of a hello message, None if the bytes are not a hello"""
+    if len(data) != HELLO.size:
+        return None
+    magic, version = HELLO.unpack(data)
+    return version if magic == HELLO_MAGIC else None
+
+
+def recv_exactly(sock, size, buffer=None):
+    """
+    Receive exactly size bytes; a single recv() may return fewer.
+
+    Returns a memoryview of the bytes (of buffer, if given, which must
+    hold at least size bytes), or None if the connection was closed
+    before the first byte. Closing in the middle raises ConnectionError.
+    """
+    if buffer is None:
+        buffer = bytearray(size)
+    view = memoryview(buffer)[:size]
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if count == 0:
+            if received == 0:
+                return None
+            raise ConnectionError(f"Connection closed after {received} of {size} bytes")
+        received += count
+    return view
+
+
+def send_frame(sock, header, payload):
+    """Send header and payload with one system call where possible, without joining them"""
+    if not hasattr(sock, 'sendmsg'):
+        # Windows has no sendmsg
+        sock.sendall(header + bytes(payload))
+        return
+    sent = sock.sendmsg([header, payload])
+    if sent < len(header):
+        sock.sendall(header[sent:])
+        sent = len(header)
+    if sent < len(header) + len(payload):
+        sock.sendall(payload[sent - len(header):])
+
+
+def negotiate_server(sock):
+    """Wait for a client hello; returns True if the client wants frames (and answers it)"""
+    sock.settimeout(HELLO_TIMEOUT)
+    try:
+        data = recv_exactly(sock, HELLO.size)
+    except socket.timeout:
+        data = None
+    finally:
+        sock.settimeout(None)
+    if data is None or parse_hello(data) != VERSION:
+        return False
+    sock.sendall(hello())
+    return True
+
+
+def negotiate_client(sock):
+    """
+    Ask the server for frames.
+
+    Returns (framed, leftover): framed is False for an old server that
+    does not answer; leftover are the bytes already read from its raw
+    stream, which belong to the first packet.
+    """
+    sock.sendall(hello())
+    data = recv_exactly(sock, HELLO.size)
+    if data is None:
+        raise ConnectionError("Connection closed during negotiation")
+    if parse_hello(data) == VERSION:
+        return True, b''
+    return False, bytes(data)
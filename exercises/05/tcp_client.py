@@ -1,9 +1,13 @@
 import socket
+import sys
 import numpy as np
 import time
 
+from emg_recorder import EMGRecorder
+from protocol import FRAME_HEADER, ProtocolError, negotiate_client, recv_exactly, unpack_header
+
 class EMGTCPClient:
-    def __init__(self, host='localhost', port=12345):
+    def __init__(self, host='localhost', port=12345, framed=True):
         self.host = host
         self.port = port
         self.socket = None
@@ -11,6 +15,15 @@ class EMGTCPClient:
         self.CHANNELS = 32
         self.SAMPLES_PER_PACKET = 18
         self.window_count = 0
+        self.packets_received = 0
+        self.recorder = None
+        # Ask for the framed protocol; falls back to raw packets with old servers
+        self.use_framing = framed
+        self.framed = False
+        self.pending = b''
+        self.expected_sequence = None
+        self.packets_lost = 0
+        self.last_header = None
 
     def print_data(self, data):
         """Print the received chunk of data"""
@@ -18,17 +31,69 @@ class EMGTCPClient:
         print(f"Shape: {data.shape}")
         self.window_count += 1
 
+    def start_recording(self, path, sampling_rate):
+        """Record all received packets to a .emg file in the background; sampling_rate goes into its header"""
+        self.recorder = EMGRecorder(path, sampling_rate=sampling_rate, channels=self.CHANNELS,
+                                    window_size=self.SAMPLES_PER_PACKET)
+        print(f"Recording to {path}")
+
+    def stop_recording(self):
+        """Finish the recording and close the file"""
+        if self.recorder:
+            self.recorder.close()
+            print(f"Recorded {self.recorder.windows_synced} packets to {self.recorder.path}")
+            self.recorder = None
+
     def connect(self):
         """Connect to the TCP server"""
         try:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.socket.connect((self.host, self.port))
+            if self.use_framing:
+                self.framed, self.pending = negotiate_client(self.socket)
             self.connected = True
-            print(f"Connected to server at {self.host}:{self.port}")
+            print(f"Connected to server at {self.host}:{self.port} "
+                  f"({'framed' if self.framed else 'raw'} packets)")
         except Exception as e:
             print(f"Error connecting to server: {e}")
             self.connected = False
 
+    def recv_exactly(self, size):
+        """Receive exactly size bytes, starting with bytes left over from negotiation"""
+        if not self.pending:
+            return recv_exactly(self.socket, size)
+        buffer = bytearray(size)
+        head = self.pending[:size]
+        buffer[:len(head)] = head
+        self.pending = self.pending[len(head):]
+        if len(head) < size and recv_exactly(self.socket, size - len(head), memoryview(buffer)[len(head):]) is None:
+            raise ConnectionError("Connection closed in the middle of a packet")
+        return memoryview(buffer)
+
+    def receive_frame(self):
+        """Receive one frame; returns (sequence, payload) or None when the connection is closed"""
+        header_bytes = self.recv_exactly(FRAME_HEADER.size)
+        if header_bytes is None:
+            return None
+        header = unpack_header(header_bytes)
+        if (header.channels, header.samples) != (self.CHANNELS, self.SAMPLES_PER_PACKET):
+            raise ProtocolError(f"Expected {self.CHANNELS}x{self.SAMPLES_PER_PACKET} packets, "
+                                f"got {header.channels}x{header.samples}")
+        payload = self.recv_exactly(header.payload_length)
+        if payload is None:
+            raise ConnectionError("Connection closed in the middle of a packet")
+        
+        # Sequence numbers only go up; a jump means lost (or skipped) packets
+        if self.expected_sequence is not None and header.sequence != self.expected_sequence:
+            if header.sequence < self.expected_sequence:
+                raise ProtocolError(f"Sequence went back from {self.expected_sequence} to {header.sequence}")
+            lost = header.sequence - self.expected_sequence
+            self.packets_lost += lost
+            print(f"Lost {lost} packets before sequence {header.sequence}")
+        self.expected_sequence = header.sequence + 1
+        self.last_header = header
+        return header.sequence, np.frombuffer(payload, dtype=header.dtype)
+
     def receive_data(self):
         """Receive and process EMG data from the server"""
         if not self.connected:
@@ -36,18 +101,38 @@ class EMGTCPClient:
             return None
 
         try:
-            # Receive data (32 channels × 18 samples of float32)
-            buffer_size = self.CHANNELS * self.SAMPLES_PER_PACKET * 4  # 4 bytes per float32
-            data = self.socket.recv(buffer_size)
+            if self.framed:
+                frame = self.receive_frame()
+                if frame is None:
+                    data = None
+                else:
+                    sequence, data = frame
+            else:
+                # Receive data (32 channels × 18 samples of float32); a single
+                # recv() may return part of a packet or more than one
+                buffer_size = self.CHANNELS * self.SAMPLES_PER_PACKET * 4  # 4 bytes per float32
+                data = self.recv_exactly(buffer_size)
+                sequence = self.packets_received
+                if data is not None:
+                    data = np.frombuffer(data, dtype=np.float32)
             
-            if not data:
+            if data is None:
                 print("Connection closed by server")
                 self.connected = False
                 return None
             
-            # Convert received bytes to numpy array
             # Reshape to (channels, samples)
-            data_array = np.frombuffer(data, dtype=np.float32).reshape(self.CHANNELS, self.SAMPLES_PER_PACKET)
+            data_array = data.reshape(self.CHANNELS, self.SAMPLES_PER_PACKET)
+            
+            # Only queues the packet, the recorder writes it in its own thread
+            if self.recorder:
+                try:
+                    self.recorder.add(data_array, sequence)
+                except RuntimeError as e:
+                    # Writing failed (e.g. disk full); keep receiving without recording
+                    print(e)
+                    self.stop_recording()
+            self.packets_received += 1
             
             return data_array
             
@@ -58,6 +143,7 @@ class EMGTCPClient:
 
     def close(self):
         """Close the connection"""
+        self.stop_recording()
         if self.socket:
             self.socket.close()
             self.connected = False
@@ -67,6 +153,13 @@ def main():
     # Create and connect the client
     client = EMGTCPClient()
     client.connect()
+    
+    # Optionally record everything: python tcp_client.py recording.emg [SAMPLING_RATE]
+    if len(sys.argv) > 1:
+        # Times in the file are computed from the rate, so it has to match the
+        # stream; 2048 Hz is the rate of the example recording
+        sampling_rate = float(sys.argv[2]) if len(sys.argv) > 2 else 2048
+        client.start_recording(sys.argv[1], sampling_rate)
 
     try:
         # Receive and process data
@@ -1,11 +1,22 @@
+import logging
 import pickle
 import socket
 import threading
 import time
 
+import numpy as np
+
+from emg_format import EMGRecording
+from pacing import PacketPacer
+from protocol import FRAME_HEADER, negotiate_server, pack_header, send_frame
+from telemetry import Telemetry, send_queue_depth
+
+DEFAULT_PKL_FILE = r'/home/oj98yqyk/code/teaching/applied-programming/exercises/02/recording.pkl'
+
 
 class EMGTCPServer:
-    def __init__(self, host='localhost', port=12345, pkl_file=r'/home/oj98yqyk/code/teaching/applied-programming/exercises/02/recording.pkl'):
+    def __init__(self, host='localhost', port=12345, pkl_file=DEFAULT_PKL_FILE, pacing_policy='burst',
+                 log_level='INFO', dump_every=0):
         self.host = host
         self.port = port
         self.pkl_file = pkl_file
@@ -16,29 +27,54 @@ class EMGTCPServer:
         self.sampling_rate = None
         self.CHANNELS = 32
         self.SAMPLES_PER_PACKET = 18
+        # 'burst' catches up after a stall, 'skip' drops the missed packets
+        self.pacing_policy = pacing_policy
+        # Counters and rates instead of printing every packet; with
+        # log_level='DEBUG', every dump_every-th packet is also logged
+        self.telemetry = Telemetry(log_level=log_level, dump_every=dump_every)
         self.load_data()
 
     def load_data(self):
-        """Load the EMG data from the PKL file"""
+        """Load the EMG data from the PKL file or a converted .emg file"""
         try:
-            with open(self.pkl_file, 'rb') as f:
-                self.data = pickle.load(f)
-            self.emg_signal = self.data['biosignal'][:32, :, :]
-            self.sampling_rate = self.data['device_information']['sampling_frequency']
+            if self.pkl_file.endswith('.emg'):
+                # Memory-mapped. A packet_major file is sent straight from the
+                # map, a channel_major file is copied into memory in packet
+                # order by prepare_packets()
+                self.data = EMGRecording(self.pkl_file)
+                self.emg_signal = self.data.as_windows()[:32, :, :]
+                self.sampling_rate = self.data.sampling_rate
+            else:
+                with open(self.pkl_file, 'rb') as f:
+                    self.data = pickle.load(f)
+                self.emg_signal = self.data['biosignal'][:32, :, :]
+                self.sampling_rate = self.data['device_information']['sampling_frequency']
+            self.prepare_packets()
             print(f"Data loaded successfully. Shape: {self.emg_signal.shape}")
             print(f"Sampling rate: {self.sampling_rate} Hz")
         except Exception as e:
             print(f"Error loading data: {e}")
             raise
 
-    def print_data(self, data, window_index):
-        """Print the current chunk of data"""
-        print(f"\nSending window {window_index}:")
-        print(f"Shape: {data.shape}")
-        print("Data values:")
-        for i in range(data.shape[0]):
-            print(f"Channel {i+1}: {data[i, :]}")
-        print("-" * 50)
+    def prepare_packets(self):
+        """Lay out all packets once as contiguous bytes, in the order they are sent"""
+        # emg_signal[..., i] is a strided slice, so every tobytes() call used
+        # to gather and allocate the packet again. Here the whole recording is
+        # reordered once to (windows, channels, samples); packet i is then
+        # bytes i * size to (i + 1) * size and is sent as a memoryview slice
+        # of this buffer without copying. The slices are made up front too,
+        # so the send loop allocates nothing per packet.
+        if isinstance(self.data, EMGRecording) and self.data.layout == 'packet_major' \
+                and self.data.num_channels == self.emg_signal.shape[0]:
+            # Already in packet order on disk: send straight from the memory map
+            self.packets = self.data.samples
+        else:
+            # Reads the whole recording into memory once
+            self.packets = np.ascontiguousarray(self.emg_signal.transpose(2, 0, 1))
+        self.packet_size = self.packets[0].nbytes
+        buffer = memoryview(self.packets).cast('B')
+        self.packet_views = [buffer[i * self.packet_size:(i + 1) * self.packet_size]
+                             for i in range(len(self.packets))]
 
     def start(self):
         """Start the TCP server"""
@@ -59,7 +95,6 @@ class EMGTCPServer:
         while self.running:
             try:
                 client_socket, address = self.server_socket.accept()
-                print(f"New connection from {address}")
                 self.clients.append(client_socket)
                 # Start a new thread to handle this client
                 client_thread = threading.Thread(target=self.handle_client, args=(client_socket,))
@@ -67,41 +102,68 @@ class EMGTCPServer:
                 client_thread.start()
             except Exception as e:
                 if self.running:
-                    print(f"Error accepting connection: {e}")
+                    self.telemetry.event('accept_error', logging.WARNING, error=e)
 
     def handle_client(self, client_socket):
         """Handle a single client connection"""
+        stats = None
+        reason = 'closed'
         try:
+            # Clients that send a hello get framed packets (see protocol.py),
+            # all others the raw stream
+            framed = negotiate_server(client_socket)
+            
             # Get the total number of windows
             num_windows = self.emg_signal.shape[2]
             window_index = 0
+            # Packet number on the device clock, skipped packets count too
+            sequence = 0
+            channels, samples = self.packets.shape[1:]
+            frame_size = FRAME_HEADER.size + self.packet_size if framed else self.packet_size
+            
+            # Packets are sent on fixed deadlines, so the work of sending
+            # does not slow the stream down below the sampling rate
+            pacer = PacketPacer(self.sampling_rate, self.SAMPLES_PER_PACKET, self.pacing_policy)
+            stream_start = time.time()
+            stats = self.telemetry.client_connected(client_socket.getpeername(), pacer)
+            self.telemetry.event('negotiated', client=stats.name, framed=framed)
 
-            while self.running and window_index < num_windows:
-                # Get the current window of data
-                current_window = self.emg_signal[..., window_index]
-                
-                # Print the data before sending
-                self.print_data(current_window, window_index)
+            while self.running:
+                # Wait until the packet is due; with the skip policy, packets
+                # we are too late for are left out
+                skipped = pacer.wait()
+                window_index = (window_index + skipped) % num_windows
+                sequence += skipped
                 
-                # Convert the data to bytes and send
-                data_bytes = current_window.tobytes()
-                client_socket.sendall(data_bytes)
+                # Only sampled packets are handed to the dump thread
+                self.telemetry.dump_packet(window_index, self.packets)
                 
-                # Calculate sleep time based on original sampling rate
-                # Since we're sending 18 samples at a time, we need to adjust the sleep time
-                sleep_time = self.SAMPLES_PER_PACKET / self.sampling_rate
-                time.sleep(sleep_time)
+                # Send the pre-serialized packet without copying it
+                if framed:
+                    header = pack_header(sequence, stream_start + sequence * pacer.interval, channels, samples,
+                                         self.packets.dtype, self.packet_size)
+                    send_frame(client_socket, header, self.packet_views[window_index])
+                else:
+                    client_socket.sendall(self.packet_views[window_index])
+                pacer.packet_sent()
+                stats.packet_sent(frame_size, send_queue_depth(client_socket))
                 
                 window_index += 1
+                sequence += 1
 
                 # loop around if we reach the end of the data
                 if window_index >= num_windows:
                     window_index = 0
-                    print("Restarting data transmission from the beginning.")
+                    self.telemetry.event('restart', client=stats.name)
 
+        except ConnectionError:
+            # The client went away
+            pass
         except Exception as e:
-            print(f"Error handling client: {e}")
+            reason = f"error: {e}"
         finally:
+            if stats is not None:
+                self.telemetry.client_disconnected(stats, reason)
             if client_socket in self.clients:
                 self.clients.remove(client_socket)
             client_socket.close()
@@ -114,6 +176,7 @@ class EMGTCPServer:
         for client in self.clients:
             client.close()
         self.clients.clear()
+        self.telemetry.close()
         print("Server stopped")
 
 if __name__ == "__main__":
@@ -0,0 +1,207 @@
+"""
+Low-overhead telemetry for the replay servers.
+
+The send loops only increment counters. Everything that formats text
+runs on two background threads:
+- the reporter logs a summary (and per-client lines at DEBUG level)
+  every `report_interval` seconds: packets, packet rate, throughput,
+  send queue depth and the achieved versus nominal sample rate of the pacer
+- the optional packet dumper logs the values of every `dump_every`-th
+  packet at DEBUG level, like the old per-packet print did for all of them
+
+Output goes through the 'emg_server' logger, so the level can be set with
+log_level or the logging module.
+"""
+import logging
+import queue
+import sys
+import threading
+import time
+
+if sys.platform.startswith('linux'):
+    import fcntl
+    import termios
+
+
+def send_queue_depth(sock):
+    """Bytes a socket has not sent yet (Linux SIOCOUTQ), None where this cannot be measured"""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        # TIOCOUTQ has the same value as SIOCOUTQ on Linux
+        return int.from_bytes(fcntl.ioctl(sock.fileno(), termios.TIOCOUTQ, bytes(4)), sys.byteorder)
+    except OSError:
+        return None
+
+
+def _queue(depth):
+    """Queue depth as a log value"""
+    return "n/a" if depth is None else f"{depth}B"
+
+
+def _rate(achieved, nominal):
+    """Achieved sampling rate compared with the nominal one, as log fields"""
+    return f"{achieved:.1f}Hz nominal={nominal}Hz ratio={100 * achieved / nominal:.2f}%"
+
+
+class ClientStats:
+    """Counters of one client, only written by the loop that serves it"""
+    
+    def __init__(self, name, pacer=None):
+        self.name = name
+        self.pacer = pacer
+        self.connected_at = time.monotonic()
+        self.packets = 0
+        self.bytes = 0
+        self.queue_depth = None
+        self._reported_packets = 0
+        self._reported_bytes = 0
+    
+    def packet_sent(self, nbytes, queue_depth=None):
+        """Count one sent packet; queue_depth is the unsent bytes waiting for this client, None if unknown"""
+        self.packets += 1
+        self.bytes += nbytes
+        self.queue_depth = queue_depth
+
+
+class Telemetry:
+    """
+    Counters, rates and queue depths of all clients of a server.
+    
+    Attributes:
+        logger (logging.Logger): The 'emg_server' logger
+        clients (dict): Client name -> ClientStats of connected clients
+        report_interval (float): Seconds between two reports
+        dump_every (int): Log the values of every n-th packet at DEBUG level, 0 to disable
+    """
+    
+    def __init__(self, log_level='INFO', report_interval=5.0, dump_every=0, dump_queue_size=256):
+        self.logger = logging.getLogger('emg_server')
+        self.logger.setLevel(log_level)
+        if not self.logger.handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+            self.logger.addHandler(handler)
+        
+        self.clients = {}
+        self.report_interval = report_interval
+        self.dump_every = dump_every
+        self.packets_dropped_from_dump = 0
+        self._packet_counter = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        
+        self._reporter = threading.Thread(target=self._report_loop)
+        self._reporter.daemon = True
+        self._reporter.start()
+        
+        self._dump_queue = None
+        if dump_every and self.logger.isEnabledFor(logging.DEBUG):
+            self._dump_queue = queue.Queue(maxsize=dump_queue_size)
+            dumper = threading.Thread(target=self._dump_loop)
+            dumper.daemon = True
+            dumper.start()
+    
+    def client_connected(self, name, pacer=None):
+        """Start counting for a new client; returns its ClientStats"""
+        stats = ClientStats(str(name), pacer)
+        with self._lock:
+            self.clients[stats.name] = stats
+        self.logger.info("event=connected client=%s clients=%d", stats.name, len(self.clients))
+        return stats
+    
+    def client_disconnected(self, stats, reason='closed'):
+        """Stop counting for a client"""
+        with self._lock:
+            self.clients.pop(stats.name, None)
+        duration = time.monotonic() - stats.connected_at
+        self.logger.info("event=disconnected client=%s reason=%s packets=%d duration=%.1fs clients=%d",
+                         stats.name, reason, stats.packets, duration, len(self.clients))
+    
+    def event(self, name, level=logging.INFO, **fields):
+        """Log a rare event, e.g. event('restart') when the recording starts over"""
+        if self.logger.isEnabledFor(level):
+            details = ' '.join(f"{key}={value}" for key, value in fields.items())
+            self.logger.log(level, "event=%s %s", name, details)
+    
+    def dump_packet(self, window_index, packets):
+        """Hand every dump_every-th packet of the (windows, channels, samples) packets to the dump thread"""
+        if self._dump_queue is None:
+            return
+        self._packet_counter += 1
+        if self._packet_counter % self.dump_every:
+            return
+        try:
+            self._dump_queue.put_nowait((window_index, packets[window_index]))
+        except queue.Full:
+            self.packets_dropped_from_dump += 1
+    
+    def close(self):
+        """Stop the background threads after a last report"""
+        self._stopped.set()
+        if self._dump_queue is not None:
+            try:
+                self._dump_queue.put_nowait(None)
+            except queue.Full:
+                pass
+        self._reporter.join()
+    
+    def _report_loop(self):
+        """Reporter thread"""
+        last = time.monotonic()
+        while not self._stopped.wait(self.report_interval):
+            now = time.monotonic()
+            self._report(now - last)
+            last = now
+        self._report(time.monotonic() - last)
+    
+    def _report(self, elapsed):
+        """Log the rates since the last report"""
+        with self._lock:
+            clients = list(self.clients.values())
+        if not clients or elapsed <= 0:
+            return
+        
+        total_packets = 0
+        total_bytes = 0
+        # (achieved, nominal) sampling rates of the paced clients
+        achieved = []
+        for stats in clients:
+            packets = stats.packets - stats._reported_packets
+            nbytes = stats.bytes - stats._reported_bytes
+            stats._reported_packets += packets
+            stats._reported_bytes += nbytes
+            total_packets += packets
+            total_bytes += nbytes
+            pacer = stats.pacer
+            if pacer is not None:
+                achieved.append((pacer.achieved_rate(), pacer.sampling_rate))
+            if self.logger.isEnabledFor(logging.DEBUG):
+                paced = "n/a"
+                if pacer is not None:
+                    paced = (f"{_rate(*achieved[-1])} skipped={pacer.packets_skipped} "
+                             f"lag={pacer.lag() * 1000:.1f}ms")
+                self.logger.debug(
+                    "client=%s packets=%d packet_rate=%.1f/s throughput=%.1fkB/s queue=%s achieved=%s",
+                    stats.name, stats.packets, packets / elapsed, nbytes / elapsed / 1000, _queue(stats.queue_depth),
+                    paced,
+                )
+        
+        depths = [stats.queue_depth for stats in clients if stats.queue_depth is not None]
+        self.logger.info(
+            "clients=%d packet_rate=%.1f/s throughput=%.1fkB/s max_queue=%s min_achieved=%s",
+            len(clients), total_packets / elapsed, total_bytes / elapsed / 1000,
+            _queue(max(depths) if depths else None),
+            _rate(*min(achieved)) if achieved else "n/a",
+        )
+    
+    def _dump_loop(self):
+        """Dump thread: format sampled packets"""
+        while True:
+            item = self._dump_queue.get()
+            if item is None:
+                return
+            window_index, data = item
+            lines = [f"Packet window={window_index} shape={data.shape}"]
+            lines += [f"Channel {i + 1}: {data[i, :]}" for i in range(data.shape[0])]
+            self.logger.debug('\n'.join(lines))